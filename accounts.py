@@ -0,0 +1,121 @@
+import os
+import re
+import json
+import hashlib
+
+from PyQt5.QtWidgets import QComboBox
+
+
+ACCOUNTS_PATH = "accounts.json"
+DATA_DIR      = "data"
+DEFAULT_USER  = "demo_user"
+
+STORE_FILES = ("tasks", "todos")
+STORE_EXTS  = (".json", ".journal", ".outbox", ".bases", ".watermark")
+
+
+def user_dir(user_id):
+    # readable when the id is already a safe file name, hashed suffix otherwise so ids cannot collide
+    name = re.sub(r"[^A-Za-z0-9_.-]", "_", user_id)
+
+    if name != user_id:
+        name += "-" + hashlib.sha1(user_id.encode()).hexdigest()[:8]
+
+    path = os.path.join(DATA_DIR, name)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def adopt_legacy_files(path):
+    # stores from before accounts existed lived in the working directory and belonged to demo_user
+    if os.path.exists(os.path.join(path, "tasks.json")) or os.path.exists(os.path.join(path, "tasks.journal")):
+        return
+
+    for base in STORE_FILES:
+        for ext in STORE_EXTS:
+            if os.path.exists(base + ext):
+                os.replace(base + ext, os.path.join(path, base + ext))
+
+
+class AccountMixin:
+    def load_accounts(self):
+        self.accounts = {"current": DEFAULT_USER, "users": [DEFAULT_USER]}
+
+        try:
+            if os.path.exists(ACCOUNTS_PATH):
+                with open(ACCOUNTS_PATH, "r") as f:
+                    self.accounts.update(json.load(f))
+
+        except Exception as e:
+            print("Accounts read failed: ", e)
+
+        self.user_id  = self.accounts["current"]
+        self.user_dir = user_dir(self.user_id)
+
+        if self.user_id == DEFAULT_USER:
+            adopt_legacy_files(self.user_dir)
+
+    def save_accounts(self):
+        try:
+            tmp_path = ACCOUNTS_PATH + ".tmp"
+
+            with open(tmp_path, "w") as f:
+                json.dump(self.accounts, f, indent=4)
+
+            os.replace(tmp_path, ACCOUNTS_PATH)
+
+        except Exception as e:
+            print("Accounts write failed: ", e)
+
+    def build_account_box(self):
+        self.account_box = QComboBox()
+        self.account_box.setObjectName("account_box")
+        self.account_box.setEditable(True)
+        self.account_box.setToolTip("Account - type a new id and press Enter to add it")
+        self.account_box.addItems(self.accounts["users"])
+        self.account_box.setCurrentText(self.user_id)
+        self.account_box.activated[str].connect(self.switch_account)
+
+        return self.account_box
+
+    def switch_account(self, user_id):
+        user_id = user_id.strip()
+
+        if not user_id or user_id == self.user_id:
+            return
+
+        # leave the old account consistent on disk; only the active one stays in memory
+        self.flush_saves()
+        self.write_journal(self.task_journal, self.tasks)
+        self.write_journal(self.todo_journal, self.todos_list)
+
+        self.task_journal.close()
+        self.todo_journal.close()
+
+        # switching back to an account reads its files; they must not still be in the writer queue
+        self.disk_writer.drain()
+
+        self.stop_listeners()
+        self.reconcile_session = None
+        self.fetching          = False
+
+        self.user_id  = user_id
+        self.user_dir = user_dir(user_id)
+
+        self.sync_engine.use_account(user_id)
+
+        if user_id not in self.accounts["users"]:
+            self.accounts["users"].append(user_id)
+
+        self.accounts["current"] = user_id
+        self.save_accounts()
+
+        self.load_tasks()
+        self.load_todos()
+
+        self.back_to_menu()
+
+        if self.firebase_ready and self.online:
+            self.start_reconcile()
+        else:
+            self.sync_engine.refresh_status()
@@ -0,0 +1,131 @@
+import asyncio
+
+from PyQt5.QtCore import QEventLoop, QTimer
+
+from sync_engine import STOP_WAIT, SyncEngine
+from firebase_threads import BATCH_RETRIES, chunked, manifest_landed, upload_writes
+from metrics import payload_size
+
+
+MAX_IN_FLIGHT = 8
+
+
+def async_available():
+    try:
+        import qasync
+    except ImportError:
+        return False
+
+    return True
+
+
+class AsyncSyncEngine(SyncEngine):
+    # Same queues and status stream as SyncEngine, but uploads are coroutines on
+    # the Qt event loop (via qasync) using the async Firestore client, so batches
+    # go out concurrently instead of one worker thread per collection.
+
+    def __init__(self, window):
+        super().__init__(window)
+        self.adb       = None
+        self.in_flight = asyncio.Semaphore(MAX_IN_FLIGHT)
+        self.jobs      = set()
+
+    def client(self):
+        if self.adb is None:
+            from firebase_admin import firestore_async
+
+            self.adb = firestore_async.client()
+
+        return self.adb
+
+    def start_job(self, queue, changed, deleted, patches, manifest):
+        job = asyncio.ensure_future(
+            self.upload(queue, self.window.user_id, changed, deleted, patches, manifest)
+        )
+
+        # queues retired by an account switch still finish, so jobs are tracked apart from them
+        self.jobs.add(job)
+        job.add_done_callback(self.jobs.discard)
+        return job
+
+    async def upload(self, queue, user_id, changed, deleted, patches, manifest):
+        stats = {"docs": 0, "bytes": 0, "retries": 0}
+        ok    = await self.send(queue["name"], user_id, changed, deleted, patches, manifest, stats)
+
+        self.on_job_finished(queue, ok, stats)
+
+    async def send(self, name, user_id, changed, deleted, patches, manifest, stats):
+        connectivity = self.window.connectivity
+
+        if not connectivity.is_online():
+            print("Upload aborted - No Internet")
+            return False
+
+        try:
+            db     = self.client()
+            writes = upload_writes(db, user_id, name, changed, deleted, patches, manifest)
+
+            stats["docs"]  = len(writes) - 1
+            stats["bytes"] = payload_size(writes)
+
+            manifest_write = writes.pop()
+
+            retries = await asyncio.gather(*(self.commit(db, chunk) for chunk in chunked(writes)))
+            stats["retries"] = sum(retries)
+
+            if not connectivity.is_online():
+                print("Upload aborted - No Internet")
+                return False
+
+            manifest_ref, data, _ = manifest_write
+            upload                = data[name]["upload"]
+
+            async def landed():
+                return manifest_landed((await manifest_ref.get()).to_dict(), name, upload)
+
+            stats["retries"] += await self.commit(db, [manifest_write], landed)
+
+            return True
+
+        except Exception as e:
+            print("Upload failed: ", e)
+            return False
+
+    async def commit(self, db, writes, landed=None):
+        async with self.in_flight:
+            for attempt in range(BATCH_RETRIES):
+                if landed and await landed():
+                    return attempt
+
+                batch = db.batch()
+
+                for ref, data, merge in writes:
+                    batch.set(ref, data, merge=merge)
+
+                try:
+                    await batch.commit()
+                    return attempt
+
+                except Exception as e:
+                    if attempt == BATCH_RETRIES - 1:
+                        raise
+
+                    print("Batch commit failed, retrying: ", e)
+                    await asyncio.sleep(2 ** attempt)
+
+    def stop(self):
+        # like the threaded engine: in-flight uploads get a few seconds to land, and the
+        # nested loop lets their acks reach the disk writer, which stops after this
+        self.stopping = True
+
+        if self.jobs:
+            waiting = QEventLoop()
+
+            for job in self.jobs:
+                job.add_done_callback(lambda _: not self.jobs and waiting.quit())
+
+            QTimer.singleShot(STOP_WAIT, waiting.quit)
+            waiting.exec_()
+
+        for job in list(self.jobs):
+            job.cancel()
@@ -0,0 +1,92 @@
+import socket
+import threading
+
+from PyQt5.QtCore import QObject, QThread, pyqtSignal
+from PyQt5.QtNetwork import QNetworkConfigurationManager
+
+
+PROBE_ADDRESS  = ("firestore.googleapis.com", 443)
+PROBE_INTERVAL = 30
+PROBE_TIMEOUT  = 3
+
+
+class ProbeThread(QThread):
+    result = pyqtSignal(bool)
+
+    def __init__(self, address):
+        super().__init__()
+        self.address  = address
+        self.wake     = threading.Event()
+        self.stopping = False
+
+    def probe_now(self):
+        self.wake.set()
+
+    def stop(self):
+        self.stopping = True
+        self.wake.set()
+        self.wait()
+
+    def run(self):
+        while not self.stopping:
+            try:
+                socket.create_connection(self.address, PROBE_TIMEOUT).close()
+                self.result.emit(True)
+
+            except OSError:
+                self.result.emit(False)
+
+            self.wake.wait(PROBE_INTERVAL)
+            self.wake.clear()
+
+
+class Connectivity(QObject):
+    # The one place that asks the OS about the network. State is cached in a
+    # plain bool, so worker threads can read it without a system query.
+
+    changed = pyqtSignal(bool)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.manager = QNetworkConfigurationManager(self)
+        self.manager.onlineStateChanged.connect(self.on_system_changed)
+
+        self.system    = self.manager.isOnline()
+        self.reachable = True
+        self.online    = self.system
+
+        self.probe = None
+
+        if PROBE_ADDRESS:
+            self.probe = ProbeThread(PROBE_ADDRESS)
+            self.probe.result.connect(self.on_probe)
+            self.probe.start()
+
+    def is_online(self):
+        return self.online
+
+    def probe_now(self):
+        if self.probe:
+            self.probe.probe_now()
+
+    def on_system_changed(self, online):
+        self.system = online
+        self.update()
+
+        if online:
+            self.probe_now()
+
+    def on_probe(self, ok):
+        self.reachable = ok
+        self.update()
+
+    def update(self):
+        online = self.system and self.reachable
+
+        if online != self.online:
+            self.online = online
+            self.changed.emit(online)
+
+    def stop(self):
+        if self.probe:
+            self.probe.stop()
@@ -0,0 +1,136 @@
+import os
+import json
+import sqlite3
+import threading
+
+from PyQt5.QtCore import QThread, pyqtSignal
+
+
+class DiskWriterThread(QThread):
+    written = pyqtSignal(str, bool)
+
+    def __init__(self):
+        super().__init__()
+        self.jobs     = []
+        self.cond     = threading.Condition()
+        self.stopping = False
+        self.busy     = False
+
+        # SQLite stores are written through connections owned by this thread
+        self.connections = {}
+
+    def replace(self, path, data=None, text=""):
+        with self.cond:
+            # a full rewrite makes every earlier pending write to the same file moot
+            self.jobs = [job for job in self.jobs if job[0] != path]
+            self.jobs.append((path, "replace", data, text))
+            self.cond.notify_all()
+
+    def append(self, path, text):
+        with self.cond:
+            if self.jobs and self.jobs[-1][0] == path and self.jobs[-1][1] == "append":
+                _, _, _, pending = self.jobs.pop()
+                text = pending + text
+
+            self.jobs.append((path, "append", None, text))
+            self.cond.notify_all()
+
+    def transact(self, path, statements):
+        # statements is a list of (sql, rows), run as one transaction
+        with self.cond:
+            self.jobs.append((path, "sql", statements, ""))
+            self.cond.notify_all()
+
+    def release(self, path):
+        with self.cond:
+            self.jobs.append((path, "close", None, ""))
+            self.cond.notify_all()
+
+    def drain(self):
+        # blocks until everything queued so far is on disk, for callers about to read those files back
+        with self.cond:
+            while self.jobs or self.busy:
+                self.cond.wait()
+
+    def stop(self):
+        with self.cond:
+            self.stopping = True
+            self.cond.notify_all()
+
+        self.wait()
+
+    def run(self):
+        while True:
+            with self.cond:
+                while not self.jobs and not self.stopping:
+                    self.cond.wait()
+
+                if not self.jobs:
+                    self.close_all()
+                    return
+
+                path, mode, data, text = self.jobs.pop(0)
+                self.busy = True
+
+            try:
+                if mode == "replace":
+                    self.write_atomic(path, data, text)
+                elif mode == "sql":
+                    self.write_sql(path, data)
+                elif mode == "close":
+                    self.close(path)
+                else:
+                    self.write_append(path, text)
+
+                self.written.emit(path, True)
+
+            except Exception as e:
+                print("File write failed: ", e)
+                self.written.emit(path, False)
+
+            with self.cond:
+                self.busy = False
+                self.cond.notify_all()
+
+    def write_atomic(self, path, data, text):
+        tmp_path = path + ".tmp"
+
+        with open(tmp_path, "w") as f:
+            if data is not None:
+                json.dump(data, f, indent=4)
+            else:
+                f.write(text)
+
+            f.flush()
+            os.fsync(f.fileno())
+
+        os.replace(tmp_path, path)
+
+    def write_append(self, path, text):
+        with open(path, "a") as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+
+    def write_sql(self, path, statements):
+        conn = self.connections.get(path)
+
+        if conn is None:
+            conn = sqlite3.connect(path)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self.connections[path] = conn
+
+        with conn:
+            for sql, rows in statements:
+                conn.executemany(sql, rows)
+
+    def close(self, path):
+        conn = self.connections.pop(path, None)
+
+        if conn is not None:
+            conn.close()
+
+    def close_all(self):
+        for path in list(self.connections):
+            self.close(path)
@@ -1,7 +1,137 @@
 
-from PyQt5.QtCore import QThread, pyqtSignal
-from PyQt5.QtNetwork import QNetworkConfigurationManager
+import time
+import datetime
 
+from PyQt5.QtCore import QObject, QRunnable, QThread, pyqtSignal
+
+from metrics import payload_size
+from manifest import (
+    BUCKETS, bucket, bucket_of, combined, manifest_of, manifest_delta, differing_buckets, upload_id
+)
+
+
+BATCH_LIMIT   = 500
+BATCH_RETRIES = 3
+
+
+def chunked(writes):
+    for start in range(0, len(writes), BATCH_LIMIT):
+        yield writes[start:start + BATCH_LIMIT]
+
+
+def manifest_update(collection_name, delta, upload):
+    from google.cloud.firestore import Increment
+
+    # Increment() is not idempotent; `upload` lets a retry see that it already landed
+    return {collection_name: {
+        "upload"  : upload,
+        "hash"    : Increment(delta["hash"]),
+        "count"   : Increment(delta["count"]),
+        "buckets" : {
+            name: {"hash": Increment(b["hash"]), "count": Increment(b["count"])}
+            for name, b in delta["buckets"].items()
+        },
+    }}
+
+
+def manifest_landed(manifest, collection_name, upload):
+    return (manifest or {}).get(collection_name, {}).get("upload") == upload
+
+
+def patch_of(item, fields):
+    # merge=True set rather than update(): same field-level semantics, but it cannot
+    # fail the whole batch when another device already removed the document
+    if fields is None:
+        return item, False
+
+    patch = {field: item[field] for field in fields if field in item}
+    patch.update(id=item["id"], rev=item.get("rev", 0), updated_at=item.get("updated_at", 0))
+
+    return patch, True
+
+
+def upload_writes(db, user_id, collection_name, changed, deleted, patches, manifest):
+    from google.cloud.firestore import DELETE_FIELD, SERVER_TIMESTAMP
+
+    ref    = db.collection("users").document(user_id).collection(collection_name)
+    writes = []
+
+    for item in changed:
+        data, merge = patch_of(item, patches.get(item["id"]))
+
+        # a merge keeps every field it does not name, including another device's delete marker
+        if merge:
+            data = {**data, "deleted": DELETE_FIELD}
+
+        writes.append((ref.document(item["id"]), {
+            **data, "bucket": bucket_of(item["id"]), "synced_at": SERVER_TIMESTAMP
+        }, merge))
+
+    # deletes are kept as markers so incremental pulls on other devices can see them
+    writes += [
+        (ref.document(item_id), {
+            "id": item_id, "deleted": True, "bucket": bucket_of(item_id), "synced_at": SERVER_TIMESTAMP
+        }, False)
+        for item_id in deleted
+    ]
+
+    # last, so the manifest only moves once every document in it has landed
+    manifest_ref = db.collection("users").document(user_id).collection("meta").document("manifest")
+    upload       = upload_id(changed, deleted, manifest)
+    writes.append((manifest_ref, manifest_update(collection_name, manifest, upload), True))
+
+    return writes
+
+
+def commit_batch(db, writes, landed=None):
+    for attempt in range(BATCH_RETRIES):
+        # a commit that reported an error, or an upload that failed after it, may still have landed
+        if landed and landed():
+            return attempt
+
+        batch = db.batch()
+
+        for ref, data, merge in writes:
+            batch.set(ref, data, merge=merge)
+
+        try:
+            batch.commit()
+            return attempt
+
+        except Exception as e:
+            if attempt == BATCH_RETRIES - 1:
+                raise
+
+            print("Batch commit failed, retrying: ", e)
+            time.sleep(2 ** attempt)
+
+
+class FirebaseInitThread(QThread):
+    # firebase_admin pulls in grpc and google-cloud; that import is the slowest
+    # part of a cold start, so it happens here and only once a key exists
+    ready  = pyqtSignal(object, float)
+    failed = pyqtSignal(str)
+
+    def __init__(self, key_path):
+        super().__init__()
+        self.key_path = key_path
+
+    def run(self):
+        try:
+            started = time.perf_counter()
+
+            import firebase_admin
+            from firebase_admin import credentials, firestore
+
+            imported = time.perf_counter() - started
+
+            if not firebase_admin._apps:
+                firebase_admin.initialize_app(credentials.Certificate(self.key_path))
+
+            self.ready.emit(firestore.client(), imported)
+
+        except Exception as e:
+            self.failed.emit(str(e))
 
 
 class FirebaseCheckThread(QThread):
@@ -21,50 +151,241 @@ class FirebaseCheckThread(QThread):
             self.result.emit(False)    
 
 
-class UploadThread(QThread):
-    finished_upload = pyqtSignal(bool) 
+class CloudFetchThread(QThread):
+    fetched = pyqtSignal(object)
 
-    def __init__(self, snapshot, upload_type, db, user_id):
+    def __init__(self, plans, db, user_id):
         super().__init__()
-        self.snapshot = snapshot
-        self.type     = upload_type
-        self.db       = db
-        self.user_id  = user_id
+        self.plans   = plans
+        self.db      = db
+        self.user_id = user_id
+
+    def run(self):
+        cloud = {}
+
+        try:
+            user_ref     = self.db.collection("users").document(self.user_id)
+            manifest_ref = user_ref.collection("meta").document("manifest")
+            manifest     = manifest_ref.get().to_dict() or {}
+
+            for collection_name, plan in self.plans.items():
+                cloud[collection_name] = self.pull(
+                    user_ref.collection(collection_name), manifest_ref,
+                    collection_name, plan, manifest.get(collection_name)
+                )
+
+        except Exception as e:
+            print("Cloud fetch failed: ", e)
+            self.fetched.emit(None)
+            return
+
+        self.fetched.emit(cloud)
 
-        self.net_manager = QNetworkConfigurationManager()
+    def pull(self, ref, manifest_ref, collection_name, plan, remote):
+        from google.cloud.firestore_v1.base_query import FieldFilter
+
+        watermark = plan["watermark"]
+        latest    = datetime.datetime.fromisoformat(watermark) if watermark else None
+
+        if remote is None or not remote.get("seeded"):
+            # never fully read yet (uploads alone cannot vouch for older docs)
+            return self.read_all(ref, manifest_ref, collection_name, latest)
+
+        # one small doc says which buckets moved since our bases; skip the rest
+        buckets = differing_buckets(plan["manifest"], remote)
+
+        if not buckets:
+            return {"records": [], "complete": False, "watermark": watermark}
+
+        query = ref.where(filter=FieldFilter("bucket", "in", buckets))
+
+        if latest is not None:
+            # composite index on (bucket, synced_at); deletes are markers, so they match too
+            query = query.where(filter=FieldFilter("synced_at", ">=", latest))
+
+        records, latest, _ = self.read(query, latest)
+
+        # our bases plus what changed should now match the manifest. If they do not,
+        # a write the watermark cannot see or drift is hiding something, and only a
+        # read of the whole collection can say what is really gone
+        expected = combined(plan["manifest"], manifest_delta(
+            [r for r in records if not r.get("deleted")],
+            [r["id"] for r in records if r.get("deleted")],
+            plan["bases"]
+        ))
+
+        if any(name in buckets for name in differing_buckets(expected, remote)):
+            return self.read_all(ref, manifest_ref, collection_name, latest)
+
+        return {
+            "records"   : records,
+            "complete"  : False,
+            "watermark" : latest.isoformat() if latest else None,
+        }
+
+    def read_all(self, ref, manifest_ref, collection_name, latest):
+        records, latest, unstamped = self.read(ref, latest)
+
+        # documents from before buckets existed are invisible to bucket and watermark queries
+        if unstamped:
+            self.stamp(ref, unstamped)
+
+        actual = manifest_of(r for r in records if not r.get("deleted"))
+        actual["buckets"] = {name: bucket(actual, name) for name in BUCKETS}
+        manifest_ref.set({collection_name: {**actual, "seeded": True}}, merge=True)
+
+        return {"records": records, "complete": True, "watermark": latest.isoformat() if latest else None}
+
+    def read(self, query, latest):
+        records   = []
+        unstamped = []
+
+        for doc in query.stream():
+            record = doc.to_dict()
+            stamp  = record.pop("synced_at", None)
+            name   = record.pop("bucket", None)
+
+            record.setdefault("id", doc.id)
+
+            if stamp is None or name is None:
+                unstamped.append(record["id"])
+
+            if stamp is not None and (latest is None or stamp > latest):
+                latest = stamp
+
+            records.append(record)
+
+        return records, latest, unstamped
+
+    def stamp(self, ref, ids):
+        from google.cloud.firestore import SERVER_TIMESTAMP
+
+        writes = [
+            (ref.document(record_id), {"bucket": bucket_of(record_id), "synced_at": SERVER_TIMESTAMP}, True)
+            for record_id in ids
+        ]
+
+        for chunk in chunked(writes):
+            commit_batch(self.db, chunk)
+
+
+class SnapshotListener(QObject):
+    changed = pyqtSignal(str, object)
+
+    def __init__(self, collection_name, watermark, db, user_id):
+        super().__init__()
+        self.collection_name = collection_name
+        self.watermark       = watermark
+        self.db              = db
+        self.user_id         = user_id
+        self.watch           = None
+
+    def start(self):
+        from google.cloud.firestore_v1.base_query import FieldFilter
+
+        query = (
+            self.db.collection("users")
+            .document(self.user_id)
+            .collection(self.collection_name)
+        )
+
+        if self.watermark:
+            since = datetime.datetime.fromisoformat(self.watermark)
+            query = query.where(filter=FieldFilter("synced_at", ">=", since))
+
+        self.watch = query.on_snapshot(self.on_snapshot)
+
+    def stop(self):
+        if self.watch:
+            self.watch.unsubscribe()
+            self.watch = None
+
+    def on_snapshot(self, docs, changes, read_time):
+        # runs on the Firestore watch thread; the signal hops back to the GUI thread
+        latest  = datetime.datetime.fromisoformat(self.watermark) if self.watermark else None
+        records = []
+
+        for change in changes:
+            if change.type.name == "REMOVED":
+                records.append({"id": change.document.id, "deleted": True})
+                continue
+
+            record = change.document.to_dict()
+            stamp  = record.pop("synced_at", None)
+            record.pop("bucket", None)
+
+            if stamp is not None and (latest is None or stamp > latest):
+                latest = stamp
+
+            records.append(record)
+
+        if not records:
+            return
+
+        self.watermark = latest.isoformat() if latest else None
+
+        self.changed.emit(self.collection_name, {
+            "records"   : records,
+            "complete"  : False,
+            "watermark" : self.watermark,
+        })
+
+
+class UploadSignals(QObject):
+    finished_upload = pyqtSignal(str, bool, object)
+
+
+class UploadJob(QRunnable):
+    def __init__(self, changed, deleted, patches, manifest, upload_type, db, user_id, connectivity):
+        super().__init__()
+        self.changed      = changed
+        self.deleted      = deleted
+        self.patches      = patches
+        self.manifest     = manifest
+        self.type         = upload_type
+        self.db           = db
+        self.user_id      = user_id
+        self.connectivity = connectivity
+        self.signals      = UploadSignals()
+        self.stats        = {"docs": 0, "bytes": 0, "retries": 0}
 
     def run(self):
-        if not self.net_manager.isOnline():
+        ok = self.upload()
+        self.signals.finished_upload.emit(self.type, ok, self.stats)
+
+    def upload(self):
+        if not self.connectivity.is_online():
             print("Upload aborted - No Internet")
-            self.finished_upload.emit(False)
-            return
-        
+            return False
+
         try:
-            ref = (
-                self.db.collection("users")
-                .document(self.user_id)
-                .collection(self.type)
-            )    
+            writes = upload_writes(
+                self.db, self.user_id, self.type, self.changed, self.deleted, self.patches, self.manifest
+            )
 
-            if not self.net_manager.isOnline():
-                print("Upload aborted - No Internet")
-                self.finished_upload.emit(False)
-                return
+            self.stats["docs"]  = len(writes) - 1
+            self.stats["bytes"] = payload_size(writes)
 
-            for item in self.snapshot:
+            manifest_write = writes.pop()
 
-                if not self.net_manager.isOnline():
+            for chunk in chunked(writes):
+
+                if not self.connectivity.is_online():
                     print("Upload aborted - No Internet")
-                    self.finished_upload.emit(False)
-                    return
+                    return False
+
+                self.stats["retries"] += commit_batch(self.db, chunk)
 
-                ref.document(item["id"]).set(item)
+            manifest_ref, data, _ = manifest_write
+            upload                = data[self.type]["upload"]
 
-            if self.net_manager.isOnline():
-                self.finished_upload.emit(True)    
+            self.stats["retries"] += commit_batch(
+                self.db, [manifest_write],
+                lambda: manifest_landed(manifest_ref.get().to_dict(), self.type, upload)
+            )
 
-            else:
-                self.finished_upload.emit(False)    
+            return True
 
-        except Exception:
-            self.finished_upload.emit(False)            
+        except Exception as e:
+            print("Upload failed: ", e)
+            return False
@@ -0,0 +1,221 @@
+import os
+import json
+
+
+class Journal:
+    def __init__(self, path, writer=None, checkpoint_every=500):
+        self.path             = path
+        self.writer           = writer
+        self.log_path         = os.path.splitext(path)[0] + ".journal"
+        self.outbox_path      = os.path.splitext(path)[0] + ".outbox"
+        self.base_path        = os.path.splitext(path)[0] + ".bases"
+        self.watermark_path   = os.path.splitext(path)[0] + ".watermark"
+        self.checkpoint_every = checkpoint_every
+        self.pending          = 0
+        self.outbox           = {}
+        self.tombstones       = set()
+        self.bases            = {}
+        self.watermark        = None
+
+    def read_json(self, path, default):
+        try:
+            if os.path.exists(path):
+                with open(path, "r") as f:
+                    return json.load(f)
+
+        except Exception as e:
+            print("File read failed: ", path, e)
+
+        return default
+
+    def load(self):
+        records = self.read_json(self.path, [])
+
+        outbox          = self.read_json(self.outbox_path, {})
+        self.outbox     = dict(outbox.get("put", {}))
+        self.tombstones = set(outbox.get("delete", []))
+        self.bases      = {r["id"]: r for r in self.read_json(self.base_path, [])}
+        self.watermark  = self.read_json(self.watermark_path, None)
+
+        index = {r["id"]: i for i, r in enumerate(records)}
+        self.pending = 0
+
+        if not os.path.exists(self.log_path):
+            return records
+
+        try:
+            with open(self.log_path, "rb") as f:
+                data = f.read()
+
+            valid = 0
+
+            for raw in data.splitlines(keepends=True):
+                line = raw.strip()
+
+                if line:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        # torn tail from a crash mid-append, nothing after it is valid
+                        break
+
+                    self.replay(entry, records, index)
+                    self.pending += 1
+
+                valid += len(raw)
+
+            self.repair_tail(data, valid)
+
+        except Exception as e:
+            print("Journal read failed: ", e)
+
+        return [r for r in records if r is not None]
+
+    def repair_tail(self, data, valid):
+        # the next append must start on a fresh line, or it is lost behind the torn one
+        if valid < len(data):
+            print("Journal torn tail dropped: ", self.log_path)
+            os.truncate(self.log_path, valid)
+
+        elif data and not data.endswith(b"\n"):
+            with open(self.log_path, "ab") as f:
+                f.write(b"\n")
+
+    def replay(self, entry, records, index):
+        if entry["op"] == "put":
+            item = entry["item"]
+
+            if item["id"] in index:
+                records[index[item["id"]]] = item
+            else:
+                index[item["id"]] = len(records)
+                records.append(item)
+
+            self.queue([item], [])
+
+        elif entry["op"] == "delete":
+            i = index.pop(entry["id"], None)
+
+            if i is not None:
+                records[i] = None
+
+            self.queue([], [entry["id"]])
+
+        elif entry["op"] == "ack":
+            self.apply_ack(entry["items"], entry["ids"])
+
+            # acknowledged ids are gone on both sides, including records a merge dropped
+            for item_id in entry["ids"]:
+                i = index.pop(item_id, None)
+
+                if i is not None:
+                    records[i] = None
+
+    def queue(self, changed, deleted):
+        # the outbox keeps one entry per id, so repeated edits coalesce into one upload
+        for item in changed:
+            self.tombstones.discard(item["id"])
+
+            # a debounced save can land after the upload it fed was already acknowledged
+            if self.bases.get(item["id"]) == item:
+                continue
+
+            self.outbox[item["id"]] = item.get("rev", 0)
+
+        for item_id in deleted:
+            self.outbox.pop(item_id, None)
+            self.tombstones.add(item_id)
+
+    def entries(self, changed=(), deleted=()):
+        lines = [json.dumps({"op": "put", "item": item}) for item in changed]
+        lines += [json.dumps({"op": "delete", "id": item_id}) for item_id in deleted]
+        return lines
+
+    def append(self, changed=(), deleted=()):
+        self.queue(changed, deleted)
+
+        self.write_lines(self.entries(changed, deleted))
+
+    def apply_ack(self, items, ids):
+        for item in items:
+            self.bases[item["id"]] = item
+
+            if self.outbox.get(item["id"], -1) <= item.get("rev", 0):
+                self.outbox.pop(item["id"], None)
+
+        for item_id in ids:
+            self.tombstones.discard(item_id)
+            self.bases.pop(item_id, None)
+
+    def acknowledge(self, items=(), ids=()):
+        # items now match the cloud and become merge bases; ids are gone from the cloud
+        items = list(items)
+        ids   = list(ids)
+
+        if not (items or ids):
+            return
+
+        self.apply_ack(items, ids)
+
+        self.write_lines([json.dumps({"op": "ack", "items": items, "ids": ids})])
+
+    def set_watermark(self, watermark):
+        if watermark == self.watermark:
+            return
+
+        self.watermark = watermark
+
+        if self.writer:
+            self.writer.replace(self.watermark_path, watermark)
+        else:
+            with open(self.watermark_path, "w") as f:
+                json.dump(watermark, f)
+
+    def write_lines(self, lines):
+        if not lines:
+            return
+
+        text = "\n".join(lines) + "\n"
+
+        if self.writer:
+            self.writer.append(self.log_path, text)
+        else:
+            with open(self.log_path, "a") as f:
+                f.write(text)
+
+        self.pending += len(lines)
+
+    def close(self):
+        pass
+
+    def needs_checkpoint(self):
+        return self.pending >= self.checkpoint_every
+
+    def checkpoint(self, records):
+        self.pending = 0
+
+        outbox = {"put": dict(self.outbox), "delete": sorted(self.tombstones)}
+        bases  = list(self.bases.values())
+
+        if self.writer:
+            self.writer.replace(self.path, records)
+            self.writer.replace(self.outbox_path, outbox)
+            self.writer.replace(self.base_path, bases)
+            self.writer.replace(self.log_path)
+            return
+
+        tmp_path = self.path + ".tmp"
+
+        with open(tmp_path, "w") as f:
+            json.dump(records, f, indent=4)
+
+        os.replace(tmp_path, self.path)
+
+        with open(self.outbox_path, "w") as f:
+            json.dump(outbox, f)
+
+        with open(self.base_path, "w") as f:
+            json.dump(bases, f)
+
+        with open(self.log_path, "w"):
+            pass
@@ -0,0 +1,328 @@
+from PyQt5.QtWidgets import QListView, QStyledItemDelegate, QStyle, QToolTip, QAbstractItemView
+from PyQt5.QtCore import Qt, QAbstractListModel, QModelIndex, QRect, QSize, QEvent, pyqtSignal
+from PyQt5.QtGui import QCursor, QPainter
+
+from themes import brush, compile_rows, compile_theme, days_left, task_state
+
+
+
+class RecordListModel(QAbstractListModel):
+    # Rows are read from a snapshot of the RecordStore's list. The store reports
+    # each edit after making it, and copy-on-write leaves the snapshot untouched,
+    # so the model can announce the change (begin*), swap in the new list, then
+    # finish it (end*) - views repaint only the rows involved.
+
+    def __init__(self, store, parent=None):
+        super().__init__(parent)
+        self.store = store
+        self.store.watch(self.on_store_changed)
+        self.take()
+
+    def take(self):
+        self.records = self.store.snapshot()
+        # cached: the view's layout asks for the row count once per row
+        self.rows    = len(self.records)
+
+    def reset(self, store):
+        self.beginResetModel()
+        self.store.unwatch(self.on_store_changed)
+        self.store = store
+        self.store.watch(self.on_store_changed)
+        self.take()
+        self.endResetModel()
+
+    def on_store_changed(self, kind, *rows):
+        if kind == "change":
+            self.take()
+            self.dataChanged.emit(self.index(rows[0]), self.index(rows[0]))
+
+        elif kind == "insert":
+            self.beginInsertRows(QModelIndex(), rows[0], rows[0])
+            self.take()
+            self.endInsertRows()
+
+        elif kind == "remove":
+            self.beginRemoveRows(QModelIndex(), rows[0], rows[0])
+            self.take()
+            self.endRemoveRows()
+
+        elif kind == "move":
+            source, dest = rows
+            self.beginMoveRows(QModelIndex(), source, source, QModelIndex(), dest + 1 if dest > source else dest)
+            self.take()
+            self.endMoveRows()
+
+        elif kind == "layout":
+            self.layoutAboutToBeChanged.emit()
+            self.take()
+            self.layoutChanged.emit()
+
+        else:
+            self.beginResetModel()
+            self.take()
+            self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self.rows
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or index.row() >= self.rows:
+            return None
+
+        record = self.records[index.row()]
+
+        if role in (Qt.DisplayRole, Qt.ToolTipRole):
+            return record["title"]
+
+        if role == Qt.UserRole:
+            return record
+
+        return None
+
+
+class RecordListView(QListView):
+    def __init__(self, model, delegate):
+        super().__init__()
+        self.setModel(model)
+        self.setItemDelegate(delegate)
+
+        # every row is the same height, so the view never measures rows it does not show;
+        # long lists are laid out in batches after the first screen is painted
+        self.setUniformItemSizes(True)
+        self.setLayoutMode(QListView.Batched)
+        self.setBatchSize(200)
+        self.setSpacing(6)
+        self.setMouseTracking(True)
+        self.setSelectionMode(QAbstractItemView.NoSelection)
+        self.setFocusPolicy(Qt.NoFocus)
+        self.setVerticalScrollMode(QAbstractItemView.ScrollPerPixel)
+        self.setHorizontalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
+        self.setCursor(Qt.PointingHandCursor)
+
+    def mouseMoveEvent(self, event):
+        # cell hover highlight: repaint just the row under the pointer
+        self.viewport().update(self.visualRect(self.indexAt(event.pos())))
+        super().mouseMoveEvent(event)
+
+
+class RowDelegate(QStyledItemDelegate):
+    # Paints a row as a strip of rounded cells; cells named in BUTTONS act as buttons.
+
+    clicked = pyqtSignal(int, str)
+
+    COLUMNS  = ()
+    BUTTONS  = ()
+    HEIGHT   = 80
+    MARGIN   = 4
+    SPACING  = 7
+    ROWS     = {"plain": ("dark", None)}
+    VARIANTS = {}
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.theme      = compile_theme(self.VARIANTS)
+        self.row_styles = compile_rows(self.ROWS)
+        self.hover      = brush("hover")
+
+    def sizeHint(self, option, index):
+        return QSize(option.rect.width(), self.HEIGHT)
+
+    def cell_rects(self, rect):
+        inner    = rect.adjusted(self.MARGIN, self.MARGIN, -self.MARGIN, -self.MARGIN)
+        fixed    = sum(width for _, width in self.COLUMNS)
+        flexible = sum(1 for _, width in self.COLUMNS if not width) or 1
+        share    = max(0, (inner.width() - fixed - self.SPACING * (len(self.COLUMNS) - 1)) // flexible)
+
+        rects = {}
+        x     = inner.left()
+
+        for name, width in self.COLUMNS:
+            rects[name] = QRect(x, inner.top(), width or share, inner.height())
+            x += (width or share) + self.SPACING
+
+        return rects
+
+    def label(self, index):
+        # numbered at paint time, so inserts and moves never touch the rows below
+        return f"{index.row()+1}. {index.data()}"
+
+    def state(self, record):
+        return "pending"
+
+    def row_state(self, record):
+        return "plain"
+
+    def texts(self, record, index):
+        return {}
+
+    def paint(self, painter, option, index):
+        record = index.data(Qt.UserRole)
+
+        if record is None:
+            return
+
+        painter.save()
+        painter.setRenderHint(QPainter.Antialiasing)
+
+        background, border = self.row_styles[self.row_state(record)]
+        painter.setPen(border)
+        painter.setBrush(background)
+        painter.drawRoundedRect(option.rect, 10, 10)
+
+        pointer = None
+
+        if option.state & QStyle.State_MouseOver and option.widget:
+            pointer = option.widget.viewport().mapFromGlobal(QCursor.pos())
+
+        styles = self.theme[self.state(record)]
+        texts  = self.texts(record, index)
+
+        for name, rect in self.cell_rects(option.rect).items():
+            style = styles[name]
+
+            painter.setPen(style["border"])
+            painter.setBrush(self.hover if pointer and rect.contains(pointer) else style["fill"])
+            painter.drawRoundedRect(rect.adjusted(1, 1, -1, -1), 10, 10)
+
+            painter.setFont(style["font"])
+            painter.setPen(style["text"])
+
+            text_rect = rect.adjusted(8, 0, -8, 0)
+            text      = texts[name]
+
+            if style["elide"]:
+                text = painter.fontMetrics().elidedText(text, Qt.ElideRight, text_rect.width())
+
+            painter.drawText(text_rect, style["align"], text)
+
+        painter.restore()
+
+    def editorEvent(self, event, model, option, index):
+        if event.type() == QEvent.MouseButtonRelease and event.button() == Qt.LeftButton:
+            for name, rect in self.cell_rects(option.rect).items():
+                if name in self.BUTTONS and rect.contains(event.pos()):
+                    self.clicked.emit(index.row(), name)
+                    return True
+
+        return False
+
+    def helpEvent(self, event, view, option, index):
+        # the full title only when hovering the (elided) title cell
+        if self.cell_rects(option.rect)["title"].contains(event.pos()):
+            QToolTip.showText(event.globalPos(), self.label(index), view)
+        else:
+            QToolTip.hideText()
+
+        return True
+
+
+def title_cell(color):
+    return {"size": 33, "color": color, "border": "white", "align": Qt.AlignLeft | Qt.AlignVCenter, "elide": True}
+
+
+class TaskViewDelegate(RowDelegate):
+    COLUMNS  = (("title", 265), ("deadline", 0), ("status", 180), ("edit", 180))
+    BUTTONS  = ("edit",)
+    HEIGHT   = 120
+    MARGIN   = 7
+    ROWS     = {"plain": ("dark", None), "priority": ("priority", "gold")}
+    VARIANTS = {
+        state: {
+            "title"    : title_cell(color),
+            "deadline" : {"size": 23, "color": color, "border": "white"},
+            "status"   : {"size": 33, "color": color, "border": "white"},
+            "edit"     : {"size": 60, "border": "white", "fill": "slate"},
+        }
+        for state, color in (
+            ("done", "lime"), ("overdue", "red"), ("due_today", "orange"), ("due_soon", "yellow"), ("pending", "white"),
+        )
+    }
+
+    def state(self, task):
+        return task_state(task)
+
+    def row_state(self, task):
+        return "priority" if task["priority"] else "plain"
+
+    def deadline_note(self, task):
+        days = days_left(task)
+        note = f"Deadline: {task['deadline']}\n"
+
+        if days is None or task["completed"]:
+            return note + "Task Completed✅"
+
+        if days < 0:
+            return note + f"Overdue by:\n{abs(days)} days!!"
+
+        if days == 0:
+            return note + "Due Today!!"
+
+        if days <= 2:
+            return note + f"Due in {days} days"
+
+        return note + f"Time Remaining:\n {days} days"
+
+    def texts(self, task, index):
+        return {
+            "title"    : self.label(index),
+            "deadline" : self.deadline_note(task),
+            "status"   : "✅" if task["completed"] else "❌",
+            "edit"     : "📝",
+        }
+
+
+class TaskCompleteDelegate(RowDelegate):
+    COLUMNS  = (("title", 310), ("status", 0), ("priority", 0))
+    BUTTONS  = ("status", "priority")
+    ROWS     = {"plain": ("dark", None), "priority": ("priority_soft", "gold")}
+    VARIANTS = {
+        state: {
+            "title"    : title_cell(color),
+            "status"   : {"size": 28, "border": "lime" if state == "done" else "red", "width": 4},
+            "priority" : {"size": 28, "border": "gold", "width": 4},
+        }
+        for state, color in (
+            ("done", "lime"), ("overdue", "red"), ("due_today", "yellow"), ("due_soon", "yellow"), ("pending", "white"),
+        )
+    }
+
+    def state(self, task):
+        return task_state(task)
+
+    def row_state(self, task):
+        return "priority" if task["priority"] else "plain"
+
+    def texts(self, task, index):
+        return {
+            "title"    : self.label(index),
+            "status"   : "✅" if task["completed"] else "❌",
+            "priority" : "💡" if task["priority"] else "⭕",
+        }
+
+
+class TodoDelegate(RowDelegate):
+    COLUMNS  = (("title", 310), ("status", 0), ("edit", 0))
+    BUTTONS  = ("status", "edit")
+    SPACING  = 6
+    VARIANTS = {
+        "done": {
+            "title"  : title_cell("lime"),
+            "status" : {"size": 28, "border": "lime", "width": 4},
+            "edit"   : {"size": 28, "border": "white", "width": 4, "fill": "slate"},
+        },
+        "pending": {
+            "title"  : title_cell("white"),
+            "status" : {"size": 28, "border": "red", "width": 4},
+            "edit"   : {"size": 28, "border": "white", "width": 4, "fill": "slate"},
+        },
+    }
+
+    def state(self, todo):
+        return "done" if todo["status"] else "pending"
+
+    def texts(self, todo, index):
+        return {
+            "title"  : self.label(index),
+            "status" : "✅" if todo["status"] else "❌",
+            "edit"   : "📝",
+        }
@@ -1,9 +1,31 @@
+import startup
 import sys
+import asyncio
 from PyQt5.QtWidgets import QApplication
 from main_window import MainWindow
+from async_engine import async_available
+from settings import load_settings
 
 if __name__ == "__main__":
     app = QApplication(sys.argv)
+
+    async_sync = load_settings()["async_sync"]
+
+    if async_sync and not async_available():
+        print("async_sync is set but qasync is not installed, using threaded uploads")
+
+    elif async_sync:
+        import qasync
+
+        loop = qasync.QEventLoop(app)
+        asyncio.set_event_loop(loop)
+
+        window = MainWindow(async_sync=True)
+        window.show()
+
+        with loop:
+            sys.exit(loop.run_forever())
+
     window = MainWindow()
     window.show()
     sys.exit(app.exec_())
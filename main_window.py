@@ -4,40 +4,56 @@ import os
 
 
 from PyQt5.QtWidgets import (
-     QWidget, QLabel,
+     QApplication, QWidget, QLabel,
     QVBoxLayout, 
     QStackedWidget
     
 )
 from PyQt5.QtCore import QTimer, Qt
 from PyQt5.QtGui import QPixmap, QFont, QFontDatabase
-from PyQt5.QtNetwork import QNetworkConfigurationManager
 
 from sync import SyncMixin
+from accounts import AccountMixin
 from ui import UiMixin
 from todos import TodosMixin
 from tasks import TasksMixin
 from storage import StorageMixin
-
-
-class MainWindow(SyncMixin, UiMixin, TodosMixin, TasksMixin, StorageMixin, QWidget):
-    def __init__(self): 
+from disk_writer import DiskWriterThread
+from connectivity import Connectivity
+from sync_engine import SyncEngine
+from async_engine import AsyncSyncEngine
+from records import RecordStore
+from list_views import RecordListModel
+from themes import set_state
+from startup import StartupTimer
+from settings import load_settings
+
+
+class MainWindow(AccountMixin, SyncMixin, UiMixin, TodosMixin, TasksMixin, StorageMixin, QWidget):
+    def __init__(self, async_sync=False): 
         super().__init__()
+        self.startup = StartupTimer()
+        self.startup.mark("imports")
+
         self.setGeometry(165,120,1600,830)
         self.setWindowTitle("Task Manager")
 
-        self.user_id             = "demo_user"
+        self.load_accounts()
+
+        self.settings            = load_settings()
 
         self.firebase_ready      = False
         self.online              = False
-        self.cloud_dirty         = False
 
+        self.init_thread         = None
         self.firebase_thread     = None
-        self.upload_thread       = None
-        self.todo_upload_thread  = None
+        self.fetch_thread        = None
+        self.fetching            = False
+        self.reconcile_session   = None
 
-        self.task_upload_pending = False
-        self.todo_upload_pending = False
+        self.realtime_sync       = self.settings["realtime_sync"]
+        self.sqlite_storage      = self.settings["sqlite_storage"]
+        self.listeners           = []
 
         self.key_missing         = False
 
@@ -88,43 +104,51 @@ class MainWindow(SyncMixin, UiMixin, TodosMixin, TasksMixin, StorageMixin, QWidg
         self.cloud_status = QLabel("☁  Cloud:\nInitializing...", self)
         self.cloud_status.setMouseTracking(True)
         self.cloud_status.setObjectName("cloud_status")
-        self.cloud_status.setStyleSheet("""
-                    QLabel#cloud_status {
-                        font-size: 35px;
-                        padding: 6px 12px;
-                        background-color: rgba(0, 0, 0, 1);
-                        border-radius: 8px;
-                        color: yellow;
-                    }                                         
-                """)
+        set_state(self.cloud_status, "init")
         
         self.cloud_status.setToolTip("initializing")
+        self.cloud_status.setContextMenuPolicy(Qt.CustomContextMenu)
+        self.cloud_status.customContextMenuRequested.connect(self.show_cloud_menu)
+
+        self.tasks        = RecordStore()
+        self.todos_list   = RecordStore()
+
+        self.task_model   = RecordListModel(self.tasks, self)
+        self.todo_model   = RecordListModel(self.todos_list, self)
+
+        # connected first, so buffered edits reach the disk writer before it stops
+        self.start_save_debounce()
 
-        self.tasks        = []
-        self.todos_list   = []
+        QApplication.instance().aboutToQuit.connect(self.flush_saves)
+        QApplication.instance().applicationStateChanged.connect(self.on_app_state_changed)
 
-        self.edit_buttons = []
+        self.disk_writer = DiskWriterThread()
+        self.disk_writer.written.connect(self.on_disk_written)
+        self.disk_writer.start()
 
+        self.connectivity = Connectivity(self)
+
+        QApplication.instance().aboutToQuit.connect(self.connectivity.stop)
+
+        self.sync_engine = AsyncSyncEngine(self) if async_sync else SyncEngine(self)
+        self.sync_engine.status.connect(self.set_cloud_status)
+        self.sync_engine.uploaded.connect(self.on_upload_finished)
+
+        # the engine stops first: uploads still finishing write their acks through the disk writer
+        QApplication.instance().aboutToQuit.connect(self.sync_engine.stop)
+        QApplication.instance().aboutToQuit.connect(self.disk_writer.stop)
+
+        # only the menu is built up front; other pages on first visit, stores once it is on screen
         self.menu_page()
-        
-        self.load_tasks()
-        self.load_todos()
-        
-        self.build_add_task_page()
-        self.build_view_task_page()
-        self.build_edit_task_page()
-        self.build_complete_task_page()
-        self.build_todo_list_page()
-        self.build_add_todos_page()
-        self.build_edit_todos()
+
+        self.startup.mark("window")
 
         self.timer = QTimer(self)
         self.timer.timeout.connect(self.update_time)
         self.timer.start(1000)
 
-        QTimer.singleShot(0, self.init_firebase)  
+        QTimer.singleShot(0, self.finish_startup)
 
-        self.net_manager = QNetworkConfigurationManager()
-        self.net_manager.onlineStateChanged.connect(self.set_cloud_status_instant)
+        self.connectivity.changed.connect(self.set_cloud_status_instant)
 
         QTimer.singleShot(0, self.start_auto_reconnect)
@@ -0,0 +1,90 @@
+import json
+import hashlib
+
+from merge import content
+
+
+BUCKETS = "0123456789abcdef"
+
+
+def bucket_of(record_id):
+    return hashlib.sha1(record_id.encode()).hexdigest()[0]
+
+
+def record_hash(record):
+    # additive 32-bit hashes, so the cloud copy can be kept current with Increment()
+    text = json.dumps(content(record), sort_keys=True, default=str)
+    return int(hashlib.sha1(text.encode()).hexdigest()[:8], 16)
+
+
+def empty_manifest():
+    return {"hash": 0, "count": 0, "buckets": {}}
+
+
+def add_to(manifest, record_id, value, count):
+    bucket = manifest["buckets"].setdefault(bucket_of(record_id), {"hash": 0, "count": 0})
+
+    bucket["hash"]    += value
+    bucket["count"]   += count
+    manifest["hash"]  += value
+    manifest["count"] += count
+
+
+def manifest_of(records):
+    manifest = empty_manifest()
+
+    for record in records:
+        add_to(manifest, record["id"], record_hash(record), 1)
+
+    return manifest
+
+
+def manifest_delta(changed, deleted, bases):
+    # bases hold what the cloud had before this upload, so the delta is new minus old
+    delta = empty_manifest()
+
+    for item in changed:
+        base = bases.get(item["id"])
+
+        if base is not None:
+            add_to(delta, item["id"], -record_hash(base), -1)
+
+        add_to(delta, item["id"], record_hash(item), 1)
+
+    for item_id in deleted:
+        base = bases.get(item_id)
+
+        if base is not None:
+            add_to(delta, item_id, -record_hash(base), -1)
+
+    return delta
+
+
+def bucket(manifest, name):
+    return manifest.get("buckets", {}).get(name, {"hash": 0, "count": 0})
+
+
+def combined(manifest, delta):
+    out = {"hash": manifest["hash"] + delta["hash"], "count": manifest["count"] + delta["count"], "buckets": {}}
+
+    for name in BUCKETS:
+        have = bucket(manifest, name)
+        add  = bucket(delta, name)
+
+        out["buckets"][name] = {"hash": have["hash"] + add["hash"], "count": have["count"] + add["count"]}
+
+    return out
+
+
+def differing_buckets(expected, remote):
+    if (expected["hash"], expected["count"]) == (remote.get("hash"), remote.get("count")):
+        return []
+
+    return [b for b in BUCKETS if bucket(expected, b) != bucket(remote, b)]
+
+
+def upload_id(changed, deleted, delta):
+    # the same changes on top of the same bases always get the same id, so a retried
+    # upload can tell whether its manifest increment already landed
+    text = json.dumps([sorted((i["id"], i.get("rev", 0)) for i in changed), sorted(deleted), delta], sort_keys=True)
+    return hashlib.sha1(text.encode()).hexdigest()[:16]
@@ -0,0 +1,160 @@
+META_FIELDS = ("rev", "updated_at", "synced_at", "bucket")
+
+
+class MergeResult:
+    def __init__(self):
+        self.records   = []
+        self.upload    = []
+        self.deleted   = []
+        self.in_sync   = []
+        self.gone      = []
+        self.conflicts = []
+
+
+def content(record):
+    return {k: v for k, v in record.items() if k not in META_FIELDS}
+
+
+def merge_fields(base, local, cloud, prefer):
+    merged    = {}
+    conflicts = []
+
+    for field in set(content(local)) | set(content(cloud)):
+        mine   = local.get(field)
+        theirs = cloud.get(field)
+        old    = base.get(field)
+
+        if mine == theirs or theirs == old:
+            merged[field] = mine
+        elif mine == old:
+            merged[field] = theirs
+        else:
+            conflicts.append(field)
+            merged[field] = theirs if prefer == "cloud" else mine
+
+    merged["rev"]        = max(local.get("rev", 0), cloud.get("rev", 0))
+    merged["updated_at"] = max(local.get("updated_at", 0), cloud.get("updated_at", 0))
+
+    if content(merged) != content(local) and content(merged) != content(cloud):
+        merged["rev"] += 1
+
+    return merged, conflicts
+
+
+def newer(local, cloud):
+    local_key = (local.get("rev", 0), local.get("updated_at", 0))
+    cloud_key = (cloud.get("rev", 0), cloud.get("updated_at", 0))
+
+    if local_key == cloud_key:
+        return None
+
+    return local if local_key > cloud_key else cloud
+
+
+def echoes(cloud, sent):
+    # rev and updated_at go out with every write, full or patch, so together they identify it
+    return sent is not None and (cloud.get("rev"), cloud.get("updated_at")) == (sent.get("rev"), sent.get("updated_at"))
+
+
+def merge_collection(local_records, cloud_records, bases, tombstones, prefer=None, complete=True, in_flight=None):
+    # three-way merge keyed by id: base is the last version both sides agreed on.
+    # complete=False means cloud_records only holds documents changed since the
+    # last pull, so a local record missing from it is simply unchanged remotely.
+    # in_flight holds records uploaded but not yet acknowledged; a cloud copy that
+    # is their echo is merged against what was sent, not the older base.
+    result    = MergeResult()
+    in_flight = in_flight or {}
+
+    cloud_by_id = {r["id"]: r for r in cloud_records}
+    seen        = set()
+
+    def keep(record, cloud):
+        result.records.append(record)
+
+        if cloud is not None and content(record) == content(cloud):
+            result.in_sync.append(record)
+        else:
+            result.upload.append(record["id"])
+
+    for local in local_records:
+        record_id = local["id"]
+        cloud     = cloud_by_id.get(record_id)
+        base      = bases.get(record_id)
+        seen.add(record_id)
+
+        if cloud is not None and echoes(cloud, in_flight.get(record_id)):
+            base = in_flight[record_id]
+
+        if cloud is None and not complete:
+            result.records.append(local)
+            continue
+
+        if cloud is not None and not cloud.get("deleted"):
+            if content(local) == content(cloud):
+                keep(local, cloud)
+                continue
+
+            if base is None:
+                winner = newer(local, cloud)
+
+                if winner is None:
+                    result.conflicts.append((record_id, "edit", []))
+                    winner = cloud if prefer == "cloud" else local
+
+                keep(winner, cloud)
+                continue
+
+            merged, fields = merge_fields(base, local, cloud, prefer)
+
+            if fields:
+                result.conflicts.append((record_id, "edit", fields))
+
+            keep(merged, cloud)
+            continue
+
+        if base is None and cloud is None:
+            keep(local, None)
+            continue
+
+        # the cloud dropped this record: follow it unless we edited it since we last agreed
+        if base is not None and content(local) == content(base):
+            result.gone.append(record_id)
+            continue
+
+        result.conflicts.append((record_id, "deleted in cloud", []))
+
+        if prefer == "cloud":
+            result.gone.append(record_id)
+        else:
+            keep(local, None)
+
+    for cloud in cloud_records:
+        record_id = cloud["id"]
+
+        if record_id in seen:
+            continue
+
+        if cloud.get("deleted"):
+            result.gone.append(record_id)
+            continue
+
+        base = bases.get(record_id)
+
+        if record_id not in tombstones and base is None:
+            keep(cloud, cloud)
+            continue
+
+        # we deleted it locally: ship the delete unless the cloud edited it since
+        if base is not None and content(cloud) != content(base):
+            result.conflicts.append((record_id, "deleted locally", []))
+
+            if prefer == "cloud":
+                keep(cloud, cloud)
+                continue
+
+        result.deleted.append(record_id)
+
+    if complete:
+        result.gone += [i for i in tombstones if i not in cloud_by_id]
+
+    return result
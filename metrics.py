@@ -0,0 +1,132 @@
+import json
+import time
+import bisect
+
+
+LATENCY_BUCKETS = (50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+def payload_size(writes):
+    return sum(len(json.dumps(data, default=str)) for _, data, _ in writes)
+
+
+def histogram():
+    return [0] * (len(LATENCY_BUCKETS) + 1)
+
+
+class SyncMetrics:
+    # Counters only ever touched on the GUI thread; workers hand their numbers
+    # back through the finished signals.
+
+    def __init__(self):
+        self.uploads      = 0
+        self.failures     = 0
+        self.docs         = 0
+        self.bytes_sent   = 0
+        self.retries      = 0
+        self.coalesced    = 0
+        self.pulls        = 0
+        self.busy_seconds = 0.0
+        self.last_sync    = None
+        self.queue_depth  = {}
+        self.started      = {}
+        self.latency      = {"upload": histogram(), "pull": histogram()}
+
+    def start(self, key):
+        self.started[key] = time.monotonic()
+
+    def finish(self, kind, key):
+        if key not in self.started:
+            return 0.0
+
+        elapsed = time.monotonic() - self.started.pop(key)
+        self.latency[kind][bisect.bisect_left(LATENCY_BUCKETS, elapsed * 1000)] += 1
+        return elapsed
+
+    def upload_finished(self, name, ok, stats):
+        self.busy_seconds += self.finish("upload", name)
+        self.retries      += stats.get("retries", 0)
+
+        if ok:
+            self.uploads    += 1
+            self.docs       += stats.get("docs", 0)
+            self.bytes_sent += stats.get("bytes", 0)
+            self.last_sync   = time.time()
+        else:
+            self.failures += 1
+
+    def pull_finished(self, ok):
+        # listener deliveries come through the same path but were never started
+        if "pull" not in self.started:
+            return
+
+        self.finish("pull", "pull")
+
+        if ok:
+            self.pulls    += 1
+            self.last_sync = time.time()
+
+    def docs_per_second(self):
+        return self.docs / self.busy_seconds if self.busy_seconds else 0.0
+
+    def since_last_sync(self):
+        return time.time() - self.last_sync if self.last_sync else None
+
+    def snapshot(self):
+        return {
+            "uploads"            : self.uploads,
+            "failures"           : self.failures,
+            "pulls"              : self.pulls,
+            "docs_written"       : self.docs,
+            "bytes_sent"         : self.bytes_sent,
+            "retries"            : self.retries,
+            "coalesced_uploads"  : self.coalesced,
+            "docs_per_second"    : round(self.docs_per_second(), 2),
+            "queue_depth"        : dict(self.queue_depth),
+            "seconds_since_sync" : self.since_last_sync(),
+            "latency_buckets_ms" : list(LATENCY_BUCKETS) + ["inf"],
+            "latency"            : {kind: list(counts) for kind, counts in self.latency.items()},
+        }
+
+    def percentile(self, kind, fraction):
+        counts = self.latency[kind]
+        total  = sum(counts)
+
+        if not total:
+            return "-"
+
+        running = 0
+
+        for i, count in enumerate(counts):
+            running += count
+
+            if running >= fraction * total:
+                break
+
+        if i < len(LATENCY_BUCKETS):
+            return "<%dms" % LATENCY_BUCKETS[i]
+
+        return ">%dms" % LATENCY_BUCKETS[-1]
+
+    def summary(self):
+        since = self.since_last_sync()
+
+        lines = [
+            "Last sync: " + ("never" if since is None else "%ds ago" % since),
+            "Queued: " + ", ".join("%s %d" % item for item in sorted(self.queue_depth.items())),
+            "Uploads: %d ok, %d failed, %d retries, %d coalesced" % (
+                self.uploads, self.failures, self.retries, self.coalesced
+            ),
+            "Written: %d docs, %.1f KB, %.1f docs/s" % (
+                self.docs, self.bytes_sent / 1024, self.docs_per_second()
+            ),
+            "Upload latency: p50 %s, p95 %s" % (
+                self.percentile("upload", 0.5), self.percentile("upload", 0.95)
+            ),
+            "Pulls: %d, p50 %s" % (self.pulls, self.percentile("pull", 0.5)),
+        ]
+        return "\n".join(lines)
+
+    def export(self, path):
+        with open(path, "w") as f:
+            json.dump(self.snapshot(), f, indent=4)
@@ -0,0 +1,22 @@
+import time
+
+
+SESSION_TTL = 300
+
+
+class ReconcileSession:
+    def __init__(self, cloud):
+        self.cloud      = cloud
+        self.fetched_at = time.monotonic()
+
+    def is_fresh(self):
+        return time.monotonic() - self.fetched_at < SESSION_TTL
+
+    def records(self, collection_name):
+        return self.cloud[collection_name]["records"]
+
+    def complete(self, collection_name):
+        return self.cloud[collection_name]["complete"]
+
+    def watermark(self, collection_name):
+        return self.cloud[collection_name]["watermark"]
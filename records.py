@@ -0,0 +1,190 @@
+import time
+
+
+def stamped(record, **changes):
+    return {**record, **changes, "rev": record.get("rev", 0) + 1, "updated_at": time.time()}
+
+
+class RecordStore:
+    # Records are never modified in place: an edit swaps in a new dict for the
+    # touched record only. snapshot() hands out the current list and marks it
+    # shared, so the next mutation copies the list (pointers only) first.
+    # Watchers hear about every row change as (kind, *rows), after the fact.
+
+    def __init__(self, records=(), dirty=(), deleted=()):
+        self.records = list(records)
+        self.shared  = False
+        self.by_id   = {r["id"]: r for r in self.records}
+
+        self.dirty   = {record_id for record_id in dirty if record_id in self.by_id}
+        self.deleted = set(deleted)
+
+        # dirty ids whose pending change only touched these fields; absent means the whole record
+        self.patches = {}
+
+        self.watchers = []
+
+    def __len__(self):
+        return len(self.records)
+
+    def __iter__(self):
+        return iter(self.records)
+
+    def __getitem__(self, index):
+        return self.records[index]
+
+    def watch(self, callback):
+        self.watchers.append(callback)
+
+    def unwatch(self, callback):
+        if callback in self.watchers:
+            self.watchers.remove(callback)
+
+    def notify(self, kind, *rows):
+        for callback in self.watchers:
+            callback(kind, *rows)
+
+    def writable(self):
+        if self.shared:
+            self.records = list(self.records)
+            self.shared  = False
+
+        return self.records
+
+    def snapshot(self):
+        self.shared = True
+        return self.records
+
+    def index_of(self, record_id):
+        for i, record in enumerate(self.records):
+            if record["id"] == record_id:
+                return i
+
+        return -1
+
+    def add(self, record):
+        record = stamped(record)
+        self.writable().append(record)
+        self.by_id[record["id"]] = record
+
+        self.dirty.add(record["id"])
+        self.patches.pop(record["id"], None)
+        self.deleted.discard(record["id"])
+
+        self.notify("insert", len(self.records) - 1)
+        return record
+
+    def update(self, index, **changes):
+        old    = self.records[index]
+        record = stamped(old, **changes)
+        self.writable()[index] = record
+        self.by_id[record["id"]] = record
+
+        fields = {field for field, value in changes.items() if old.get(field) != value}
+
+        if record["id"] not in self.dirty:
+            self.patches[record["id"]] = fields
+        elif record["id"] in self.patches:
+            self.patches[record["id"]] |= fields
+
+        self.dirty.add(record["id"])
+
+        self.notify("change", index)
+        return record
+
+    def remove(self, index):
+        record = self.writable().pop(index)
+        self.by_id.pop(record["id"], None)
+
+        self.dirty.discard(record["id"])
+        self.patches.pop(record["id"], None)
+        self.deleted.add(record["id"])
+
+        self.notify("remove", index)
+        return record
+
+    def replace_all(self, records):
+        old = self.records
+
+        self.records = list(records)
+        self.shared  = False
+        self.by_id   = {r["id"]: r for r in self.records}
+
+        self.dirty   = set()
+        self.deleted = set()
+        self.patches = {}
+
+        # a merge usually keeps every row in place and swaps a few records
+        if [r["id"] for r in old] != [r["id"] for r in self.records]:
+            self.notify("reset")
+            return
+
+        for index, (before, after) in enumerate(zip(old, self.records)):
+            if before != after:
+                self.notify("change", index)
+
+    def sort(self, key):
+        before = [r["id"] for r in self.records]
+        self.writable().sort(key=key)
+        after  = [r["id"] for r in self.records]
+
+        if before == after:
+            return
+
+        # one edited record changing place is the common case; anything else reorders wholesale
+        first = next(i for i in range(len(after)) if before[i] != after[i])
+        last  = next(i for i in reversed(range(len(after))) if before[i] != after[i])
+
+        if before[first + 1:last + 1] == after[first:last]:
+            self.notify("move", first, last)
+        elif before[first:last] == after[first + 1:last + 1]:
+            self.notify("move", last, first)
+        else:
+            self.notify("layout")
+
+    def add_tombstones(self, ids):
+        ids = [record_id for record_id in ids if record_id not in self.by_id]
+        self.deleted.update(ids)
+        return ids
+
+    def drop_tombstones(self, ids):
+        self.deleted.difference_update(ids)
+
+    def mark_dirty(self, ids):
+        for record_id in ids:
+            self.dirty.add(record_id)
+            self.patches.pop(record_id, None)
+
+    def has_changes(self):
+        return bool(self.dirty or self.deleted)
+
+    def take_changes(self):
+        changed = [self.by_id[record_id] for record_id in self.dirty]
+        deleted = list(self.deleted)
+        patches = {record_id: sorted(fields) for record_id, fields in self.patches.items()}
+
+        self.dirty   = set()
+        self.deleted = set()
+        self.patches = {}
+        return changed, deleted, patches
+
+    def restore_changes(self, changed, deleted, patches=None):
+        # an upload failed: put its ids back unless a newer edit already superseded them
+        patches = patches or {}
+
+        for record in changed:
+            record_id = record["id"]
+
+            if record_id not in self.by_id:
+                continue
+
+            if record_id in patches and (record_id not in self.dirty or record_id in self.patches):
+                self.patches[record_id] = self.patches.get(record_id, set()) | set(patches[record_id])
+            else:
+                self.patches.pop(record_id, None)
+
+            self.dirty.add(record_id)
+
+        for record_id in deleted:
+            if record_id not in self.by_id:
+                self.deleted.add(record_id)
@@ -0,0 +1,26 @@
+import os
+import json
+
+
+SETTINGS_PATH = "settings.json"
+
+DEFAULTS = {
+    "realtime_sync"  : True,    # snapshot listeners; false polls the cloud instead
+    "async_sync"     : False,   # uploads as asyncio coroutines on the Qt loop, needs qasync
+    "sqlite_storage" : False,   # one SQLite file per store instead of the JSON journal
+    "save_debounce"  : 300,     # ms of edits batched into one journal write; 0 writes every edit
+}
+
+
+def load_settings():
+    settings = dict(DEFAULTS)
+
+    try:
+        if os.path.exists(SETTINGS_PATH):
+            with open(SETTINGS_PATH, "r") as f:
+                settings.update(json.load(f))
+
+    except Exception as e:
+        print("Settings read failed: ", e)
+
+    return settings
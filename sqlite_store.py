@@ -0,0 +1,214 @@
+import os
+import json
+import sqlite3
+import datetime
+
+from journal import Journal
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS records (
+    id        TEXT PRIMARY KEY,
+    data      TEXT NOT NULL,
+    deadline  TEXT,
+    priority  INTEGER,
+    completed INTEGER,
+    ord       INTEGER
+);
+CREATE TABLE IF NOT EXISTS outbox (
+    id      TEXT PRIMARY KEY,
+    rev     INTEGER,
+    deleted INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS bases (
+    id   TEXT PRIMARY KEY,
+    data TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key   TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+# sort_tasks() order; the index carries rowid, so ties keep the order they were saved in
+LISTING    = "CREATE INDEX IF NOT EXISTS records_listing ON records (priority DESC, ord)"
+TASK_ORDER = "priority DESC, ord, rowid"
+
+COLUMNS = (("deadline", "TEXT"), ("priority", "INTEGER"), ("completed", "INTEGER"), ("ord", "INTEGER"))
+
+# rowid is kept on update, so records load back in the order they were first saved
+UPSERT = """
+INSERT INTO records (id, data, deadline, priority, completed, ord) VALUES (?, ?, ?, ?, ?, ?)
+ON CONFLICT(id) DO UPDATE SET
+    data = excluded.data, deadline = excluded.deadline, priority = excluded.priority,
+    completed = excluded.completed, ord = excluded.ord
+"""
+
+
+def iso_deadline(record):
+    # stored as YYYY-MM-DD so the column sorts and ranges by date
+    try:
+        return datetime.datetime.strptime(record["deadline"], "%d-%m-%Y").date().isoformat()
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+def row_of(record):
+    return (
+        record["id"], json.dumps(record), iso_deadline(record),
+        record.get("priority"), record.get("completed"), record.get("order"),
+    )
+
+
+class SqliteJournal(Journal):
+    # Same interface as Journal, but every append/ack is one transaction that
+    # touches only the affected rows, so there is nothing to checkpoint. The
+    # whole list is still loaded into the RecordStore, which the list models
+    # and sync read from; edits reach this file only after the save debounce.
+    # Transactions run on the disk writer thread; this connection only reads.
+
+    def __init__(self, path, writer=None, checkpoint_every=500, order="rowid"):
+        super().__init__(path, writer, checkpoint_every)
+        self.db_path = os.path.splitext(path)[0] + ".db"
+        self.order   = order
+
+        self.conn = sqlite3.connect(self.db_path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+
+        self.add_columns()
+        self.conn.execute(LISTING)
+
+    def add_columns(self):
+        # files written before the columns existed: add them and fill them from the stored JSON
+        have    = {row[1] for row in self.conn.execute("PRAGMA table_info(records)")}
+        missing = [(name, kind) for name, kind in COLUMNS if name not in have]
+
+        if not missing:
+            return
+
+        with self.conn:
+            for name, kind in missing:
+                self.conn.execute("ALTER TABLE records ADD COLUMN %s %s" % (name, kind))
+
+            records = [json.loads(data) for (data,) in self.conn.execute("SELECT data FROM records")]
+            self.conn.executemany(UPSERT, [row_of(r) for r in records])
+
+    def load(self):
+        if not self.conn.execute("SELECT 1 FROM meta WHERE key = 'created'").fetchone():
+            return self.import_files()
+
+        records = [json.loads(data) for (data,) in self.conn.execute("SELECT data FROM records ORDER BY " + self.order)]
+
+        self.outbox     = {}
+        self.tombstones = set()
+
+        for record_id, rev, deleted in self.conn.execute("SELECT id, rev, deleted FROM outbox"):
+            if deleted:
+                self.tombstones.add(record_id)
+            else:
+                self.outbox[record_id] = rev
+
+        self.bases = {record_id: json.loads(data) for record_id, data in self.conn.execute("SELECT id, data FROM bases")}
+
+        row = self.conn.execute("SELECT value FROM meta WHERE key = 'watermark'").fetchone()
+        self.watermark = json.loads(row[0]) if row else None
+        self.pending   = 0
+
+        return records
+
+    def import_files(self):
+        # first start on SQLite: carry over whatever the JSON journal holds
+        records = super().load()
+
+        self.transact(
+            [(UPSERT, [row_of(r) for r in records]),
+             ("INSERT OR REPLACE INTO bases VALUES (?, ?)", [
+                 (record_id, json.dumps(base)) for record_id, base in self.bases.items()
+             ])]
+            + self.outbox_rows(list(self.outbox) + list(self.tombstones))
+            + [self.meta_rows(watermark=self.watermark, created=True)]
+        )
+
+        self.pending = 0
+        return records
+
+    def transact(self, statements):
+        if self.writer:
+            self.writer.transact(self.db_path, statements)
+            return
+
+        with self.conn:
+            for sql, rows in statements:
+                self.conn.executemany(sql, rows)
+
+    def close(self):
+        # the writer finishes whatever is queued for this file before letting go of it
+        if self.writer:
+            self.writer.release(self.db_path)
+
+        self.conn.close()
+
+    def outbox_rows(self, ids):
+        put     = [(i, self.outbox[i]) for i in ids if i in self.outbox]
+        deleted = [(i,) for i in ids if i not in self.outbox and i in self.tombstones]
+        gone    = [(i,) for i in ids if i not in self.outbox and i not in self.tombstones]
+
+        return [
+            ("INSERT OR REPLACE INTO outbox VALUES (?, ?, 0)", put),
+            ("INSERT OR REPLACE INTO outbox VALUES (?, NULL, 1)", deleted),
+            ("DELETE FROM outbox WHERE id = ?", gone),
+        ]
+
+    def meta_rows(self, **values):
+        return ("INSERT OR REPLACE INTO meta VALUES (?, ?)", [(k, json.dumps(v)) for k, v in values.items()])
+
+    def append(self, changed=(), deleted=()):
+        self.queue(changed, deleted)
+
+        self.transact([
+            (UPSERT, [row_of(r) for r in changed]),
+            ("DELETE FROM records WHERE id = ?", [(i,) for i in deleted]),
+        ] + self.outbox_rows([r["id"] for r in changed] + list(deleted)))
+
+    def acknowledge(self, items=(), ids=()):
+        items = list(items)
+        ids   = list(ids)
+
+        if not (items or ids):
+            return
+
+        self.apply_ack(items, ids)
+
+        self.transact([
+            ("INSERT OR REPLACE INTO bases VALUES (?, ?)", [(item["id"], json.dumps(item)) for item in items]),
+            ("DELETE FROM bases WHERE id = ?", [(i,) for i in ids]),
+            ("DELETE FROM records WHERE id = ?", [(i,) for i in ids]),
+        ] + self.outbox_rows([item["id"] for item in items] + ids))
+
+    def set_watermark(self, watermark):
+        if watermark == self.watermark:
+            return
+
+        self.watermark = watermark
+
+        self.transact([self.meta_rows(watermark=watermark)])
+
+    def needs_checkpoint(self):
+        return False
+
+    def checkpoint(self, records):
+        # callers checkpoint after edits they did not describe (reorders, bulk moves);
+        # diff against the table so even then only the rows that differ are written.
+        # A write still queued can make the diff repeat it, which is harmless.
+        self.pending = 0
+
+        stored = dict(self.conn.execute("SELECT id, data FROM records"))
+        rows   = [row_of(r) for r in records]
+
+        self.transact([
+            (UPSERT, [row for row in rows if stored.get(row[0]) != row[1]]),
+            ("DELETE FROM records WHERE id = ?", [
+                (record_id,) for record_id in stored.keys() - {row[0] for row in rows}
+            ]),
+        ])
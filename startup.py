@@ -0,0 +1,40 @@
+import time
+
+
+PROCESS_START  = time.perf_counter()
+STARTUP_BUDGET = 0.5
+
+cold_start = True
+
+
+class StartupTimer:
+    # Phases are measured back to back. The first timer of the process is the
+    # cold start and counts from the first import of this module, so the report
+    # also covers interpreter and library import time.
+
+    def __init__(self):
+        global cold_start
+
+        self.start  = PROCESS_START if cold_start else time.perf_counter()
+        self.last   = self.start
+        self.phases = []
+
+        cold_start = False
+
+    def mark(self, phase):
+        now = time.perf_counter()
+        self.phases.append((phase, now - self.last))
+        self.last = now
+
+    def total(self):
+        return self.last - self.start
+
+    def report(self):
+        line = "Startup %dms: " % (self.total() * 1000) + ", ".join(
+            "%s %dms" % (phase, seconds * 1000) for phase, seconds in self.phases
+        )
+
+        if self.total() > STARTUP_BUDGET:
+            line += " - over the %dms budget" % (STARTUP_BUDGET * 1000)
+
+        return line
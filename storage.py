@@ -1,126 +1,117 @@
 
-import json
-import copy
+import os
 
-from PyQt5.QtCore import QTimer
+from PyQt5.QtCore import QTimer, Qt
 
-from firebase_threads import UploadThread
+from journal import Journal
+from sqlite_store import TASK_ORDER, SqliteJournal
 
 
 class StorageMixin:
-    def save_todo_file(self):
-        try:
-            with open("todos.json", "w") as f:
-                json.dump(self.todos_list, f, indent=4)
-
-        except Exception as e:
-            print("File write Failed: ", e)        
-
-        self.cloud_dirty = True
-
-        if not (self.firebase_ready and self.online):
-            self.set_cloud_status("offline")
+    def start_save_debounce(self):
+        self.save_debounce = self.settings["save_debounce"]
+        self.save_buffers  = {
+            "tasks": {"changed": {}, "deleted": set()},
+            "todos": {"changed": {}, "deleted": set()},
+        }
+
+        self.save_timer = QTimer(self)
+        self.save_timer.setSingleShot(True)
+        self.save_timer.timeout.connect(self.flush_saves)
+
+    def queue_save(self, name, changed, deleted):
+        buffer = self.save_buffers[name]
+
+        for record in changed:
+            # a dict rather than a set: journal order is list order for new records
+            buffer["changed"][record["id"]] = None
+
+        for record_id in deleted:
+            buffer["changed"].pop(record_id, None)
+            buffer["deleted"].add(record_id)
+
+        if not self.save_debounce:
+            self.flush_save(name)
             return
-        
-        self.set_cloud_status("syncing")
 
-        todos_snapshot = copy.deepcopy(self.todos_list)
+        # a fixed window from the first edit, so a long burst cannot postpone the save forever
+        if not self.save_timer.isActive():
+            self.save_timer.start(self.save_debounce)
 
-        if self.todo_upload_thread and self.todo_upload_thread.isRunning():
-            self.todo_upload_pending = True
-            return
+    def flush_save(self, name):
+        buffer = self.save_buffers[name]
 
-        self.todo_upload_thread = UploadThread(
-            todos_snapshot, "todos", self.db, self.user_id
-        )
+        if name == "tasks":
+            store, journal, upload = self.tasks, self.task_journal, self.upload_tasks
+        else:
+            store, journal, upload = self.todos_list, self.todo_journal, self.upload_todos
 
-        self.todo_upload_thread.finished_upload.connect(self.on_todo_upload_finished)
-        self.todo_upload_thread.finished.connect(self.on_todo_upload_thread_finished)
-        self.todo_upload_thread.start()
+        # a merge may have replaced a buffered record since; persist what the store holds now
+        changed = [store.by_id[i] for i in buffer["changed"] if i in store.by_id]
+        deleted = sorted(buffer["deleted"])
 
-    def save_task_file(self):
-        self.sort_tasks()
+        buffer["changed"] = {}
+        buffer["deleted"] = set()
 
-        try:
-            with open("tasks.json", "w") as f:
-                json.dump(self.tasks, f, indent=4)
+        if changed or deleted:
+            self.write_journal(journal, store, changed, deleted)
 
-        except Exception as e:
-            print("File write failed: ", e)        
+        upload()
 
-        self.cloud_dirty = True
+    def flush_saves(self):
+        self.save_timer.stop()
 
-        if not (self.firebase_ready and self.online):
-            self.set_cloud_status("offline")
-            return
-        
-        self.set_cloud_status("syncing")
+        for name, buffer in self.save_buffers.items():
+            if buffer["changed"] or buffer["deleted"]:
+                self.flush_save(name)
 
-        tasks_snapshot = copy.deepcopy(self.tasks)
+    def on_app_state_changed(self, state):
+        if state != Qt.ApplicationActive:
+            self.flush_saves()
 
-        if self.upload_thread and self.upload_thread.isRunning():
-            self.task_upload_pending = True
-            return
+    def open_journal(self, name):
+        path = os.path.join(self.user_dir, name + ".json")
 
-        self.upload_thread = UploadThread(
-            tasks_snapshot, "tasks", self.db, self.user_id
-        )    
-        self.upload_thread.finished_upload.connect(self.on_task_upload_finished)
-        self.upload_thread.finished.connect(self.on_upload_thread_finished)
-        self.upload_thread.start()      
+        if not self.sqlite_storage:
+            return Journal(path, self.disk_writer)
 
-    def on_task_upload_finished(self, ok):
-        if ok:
-            local_ids = {t["id"] for t in self.tasks}
-            self.delete_missing_cloud_docs("tasks", local_ids)
+        # tasks load through the listing index, already in the order the task views show
+        return SqliteJournal(path, self.disk_writer, order=TASK_ORDER if name == "tasks" else "rowid")
 
-            if not self.task_upload_pending:
-                self.cloud_dirty = False
-                self.set_cloud_status("synced")
+    def write_journal(self, journal, records, changed=(), deleted=()):
+        try:
+            if changed or deleted:
+                journal.append(changed, deleted)
 
-        else:
-            self.set_cloud_status("offline")   
+            if not (changed or deleted) or journal.needs_checkpoint():
+                journal.checkpoint(records.snapshot())
 
-        if self.task_upload_pending:
-            self.task_upload_pending = False
-            QTimer.singleShot(0, self.save_task_file) 
+        except Exception as e:
+            print("File write failed: ", e)
 
-    def on_todo_upload_finished(self, ok):
-        if ok:
-            local_ids = {t["id"] for t in self.todos_list}
-            self.delete_missing_cloud_docs("todos", local_ids)
+    def on_disk_written(self, path, ok):
+        if not ok:
+            print("Local save failed: ", path)
 
-            if not self.todo_upload_pending:
-                self.cloud_dirty = False
-                self.set_cloud_status("synced")
+    def drain_outbox(self):
+        self.sync_engine.push_all()
 
-        else:
-            self.set_cloud_status("offline")   
+    def save_todo_file(self, changed=(), deleted=()):
+        self.queue_save("todos", changed, deleted)
 
-        if self.todo_upload_pending:
-            self.todo_upload_pending = False
-            QTimer.singleShot(0, self.save_todo_file)             
+    def upload_todos(self):
+        self.sync_engine.push("todos")
 
-    def on_upload_thread_finished(self):
-        if self.upload_thread:
-            self.upload_thread.deleteLater()
-            self.upload_thread = None
+    def save_task_file(self, changed=(), deleted=()):
+        self.sort_tasks()
 
-    def on_todo_upload_thread_finished(self):
-        if self.todo_upload_thread:
-            self.todo_upload_thread.deleteLater()
-            self.todo_upload_thread = None    
+        self.queue_save("tasks", changed, deleted)
 
-    def delete_missing_cloud_docs(self, collection_name, local_ids):
-        if not (self.firebase_ready and self.online):
-            return
-        
-        ref = (
-            self.db.collection("users")
-            .document(self.user_id)
-            .collection(collection_name)
-        )
-
-        for doc in ref.stream():
-            if doc.id not in local_ids:
-                doc.reference.delete()
+    def upload_tasks(self):
+        self.sync_engine.push("tasks")
+
+    def on_upload_finished(self, name, ok):
+        if ok:
+            self.reset_retry()
+        else:
+            self.schedule_retry()
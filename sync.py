@@ -1,28 +1,70 @@
 
 
 import os
+import random
 
 
-import firebase_admin
-from firebase_admin import credentials, firestore
 
 from PyQt5.QtWidgets import (
     QWidget, QLabel,
     QVBoxLayout, QHBoxLayout, QPushButton,
-    QRadioButton, QButtonGroup
+    QRadioButton, QButtonGroup, QMenu
     
 )
 from PyQt5.QtCore import QTimer, Qt
 
-from firebase_threads import FirebaseCheckThread
+from firebase_threads import FirebaseInitThread, FirebaseCheckThread, CloudFetchThread, SnapshotListener
+from reconcile import ReconcileSession
+from merge import merge_collection
+from manifest import manifest_of
+from themes import set_state
+
+
+RETRY_BASE    = 2
+RETRY_MAX     = 300
+POLL_INTERVAL = 60000
+METRICS_PATH  = "sync_metrics.json"
+
 
 class SyncMixin:
     def start_auto_reconnect(self):
-        self.reconnect_timer = QTimer(self)
-        self.reconnect_timer.timeout.connect(self.try_firebase_reconnect)
-        self.reconnect_timer.start(5000)
+        self.retry_attempts = 0
+
+        self.retry_timer = QTimer(self)
+        self.retry_timer.setSingleShot(True)
+        self.retry_timer.timeout.connect(self.on_retry_timer)
+
+        self.poll_timer = QTimer(self)
+        self.poll_timer.timeout.connect(self.start_reconcile)
+
+        self.connectivity.changed.connect(self.on_internet_state_changed)
+
+    def schedule_retry(self):
+        if self.key_missing or not hasattr(self, "retry_timer"):
+            return
+
+        if self.retry_timer.isActive():
+            return
+
+        # jittered exponential backoff, so a flaky link is not hammered
+        delay = min(RETRY_MAX, RETRY_BASE * 2 ** self.retry_attempts)
+        delay *= random.uniform(0.5, 1.5)
+
+        self.retry_attempts += 1
+        self.retry_timer.start(int(delay * 1000))
+
+    def reset_retry(self):
+        self.retry_attempts = 0
+
+        if hasattr(self, "retry_timer"):
+            self.retry_timer.stop()
+
+    def on_retry_timer(self):
+        if not self.connectivity.is_online():
+            self.schedule_retry()
+            return
 
-        self.net_manager.onlineStateChanged.connect(self.on_internet_state_changed)
+        self.try_firebase_reconnect()
 
     def on_internet_state_changed(self, is_online):    
         if not is_online:
@@ -35,7 +77,7 @@ class SyncMixin:
 
     def try_firebase_reconnect(self):
 
-        if not self.net_manager.isOnline():
+        if not self.connectivity.is_online():
             return
 
         if not hasattr(self, "db") or self.db is None:  
@@ -49,9 +91,7 @@ class SyncMixin:
             self.run_firebase_check()
             return
         
-        self.set_cloud_status("synced")
-        if hasattr(self, "reconnect_timer"):
-            self.reconnect_timer.stop()
+        self.drain_outbox()
 
     def run_firebase_check(self):
 
@@ -71,41 +111,219 @@ class SyncMixin:
         self.online = is_online
 
         if not is_online:
+            self.stop_listeners()
             self.set_cloud_status("offline")  
         else:
             self.try_firebase_reconnect()    
 
-    def get_cloud_tasks(self):
-        if not (hasattr(self, "db") and self.online):
-            return []
+    def start_listeners(self):
+        if self.listeners or (hasattr(self, "poll_timer") and self.poll_timer.isActive()):
+            return
+
+        if not self.realtime_sync:
+            self.poll_timer.start(POLL_INTERVAL)
+            return
 
         try:
-            return [doc.to_dict() for doc in self.db.collection("users")
-                    .document(self.user_id)
-                    .collection("tasks")
-                    .stream()]
+            for name, journal in (("tasks", self.task_journal), ("todos", self.todo_journal)):
+                listener = SnapshotListener(name, journal.watermark, self.db, self.user_id)
+                listener.changed.connect(self.on_remote_changes)
+                listener.start()
+                self.listeners.append(listener)
+
         except Exception as e:
-            print("Cloud fetch failed: ", e)
-            return []          
+            print("Realtime listener failed, polling instead: ", e)
+            self.stop_listeners()
+            self.poll_timer.start(POLL_INTERVAL)
 
-    def get_cloud_todos(self):
-        if not(hasattr(self, "db") and self.online):
-            return []
+    def stop_listeners(self):
+        for listener in self.listeners:
+            try:
+                listener.stop()
+            except Exception as e:
+                print("Listener stop failed: ", e)
 
-        try:
-            return [doc.to_dict() for doc in
-                    self.db.collection("users")
-                    .document(self.user_id)
-                    .collection("todos")
-                    .stream()]
+            listener.deleteLater()
 
-        except Exception as e:
-            print("Cloud fetch failed: ", e)
-            return []    
+        self.listeners = []
+
+        if hasattr(self, "poll_timer"):
+            self.poll_timer.stop()
+
+    def from_other_account(self):
+        # results queued by a listener or fetch started before an account switch
+        sender = self.sender()
+        return sender is not None and getattr(sender, "user_id", self.user_id) != self.user_id
+
+    def on_remote_changes(self, collection_name, delta):
+        if self.from_other_account():
+            return
+
+        if self.reconcile_session is not None:
+            # the conflict page is waiting on the user; the listener restarts after it
+            return
+
+        cloud = {
+            "tasks": {"records": [], "complete": False, "watermark": self.task_journal.watermark},
+            "todos": {"records": [], "complete": False, "watermark": self.todo_journal.watermark},
+        }
+        cloud[collection_name] = delta
+
+        self.on_cloud_fetched(cloud)
+
+    def reconciling(self):
+        return self.fetching or self.reconcile_session is not None
+
+    def start_reconcile(self):
+        if self.fetch_thread and self.fetch_thread.isRunning():
+            return
+
+        plans = {
+            name: {
+                "watermark" : journal.watermark,
+                "manifest"  : manifest_of(journal.bases.values()),
+                "bases"     : dict(journal.bases),
+            }
+            for name, journal in (("tasks", self.task_journal), ("todos", self.todo_journal))
+        }
+
+        self.sync_engine.metrics.start("pull")
+        self.fetching = True
+
+        self.fetch_thread = CloudFetchThread(plans, self.db, self.user_id)
+        self.fetch_thread.fetched.connect(self.on_cloud_fetched)
+        self.fetch_thread.finished.connect(self.on_fetch_thread_finished)
+        self.fetch_thread.start()
+
+    def on_fetch_thread_finished(self):
+        if not self.fetch_thread:
+            return
+
+        stale = self.fetch_thread.user_id != self.user_id
+
+        self.fetch_thread.deleteLater()
+        self.fetch_thread = None
+
+        # the switched-to account could not start its pull while this one ran
+        if stale and self.firebase_ready and self.online:
+            self.start_reconcile()
+
+    def on_cloud_fetched(self, cloud):
+        if self.from_other_account():
+            return
+
+        self.sync_engine.metrics.pull_finished(cloud is not None)
+        self.fetching = False
+
+        if cloud is None:
+            self.set_cloud_status("offline")
+            self.schedule_retry()
+
+            # a re-fetch for an expired conflict page failed; its choices can no longer be applied
+            if self.reconcile_session is not None and not self.reconcile_session.is_fresh():
+                self.reconcile_session = None
+                self.leave_conflict_page()
+            return
+
+        self.reconcile_session = ReconcileSession(cloud)
+
+        task_result, todo_result = self.merge_session(self.reconcile_session)
+
+        if task_result.conflicts or todo_result.conflicts:
+            
+            if not hasattr(self, "sync_conflict_page"):
+                self.build_sync_conflict_page()
+
+            self.update_sync_conflict_page(task_result, todo_result)
+            self.stack.setCurrentWidget(self.sync_conflict_page)
+            return    
+        
+        self.apply_merge(task_result, todo_result)
+
+        # a re-fetch from the conflict page may find the conflicts already resolved elsewhere
+        self.leave_conflict_page()
+
+    def leave_conflict_page(self):
+        if hasattr(self, "sync_conflict_page") and self.stack.currentWidget() is self.sync_conflict_page:
+            self.back_to_menu()
+
+    def merge_session(self, session, task_prefer=None, todo_prefer=None):
+        task_result = merge_collection(
+            self.tasks, session.records("tasks"),
+            self.task_journal.bases, self.task_journal.tombstones,
+            task_prefer, session.complete("tasks"), self.sync_engine.uploading("tasks")
+        )
+        todo_result = merge_collection(
+            self.todos_list, session.records("todos"),
+            self.todo_journal.bases, self.todo_journal.tombstones,
+            todo_prefer, session.complete("todos"), self.sync_engine.uploading("todos")
+        )
+        return task_result, todo_result
+
+    def apply_merge(self, task_result, todo_result):
+        session = self.reconcile_session
+        self.reconcile_session = None
+
+        tasks_changed = self.apply_merge_result(self.tasks, self.task_journal, task_result)
+        todos_changed = self.apply_merge_result(self.todos_list, self.todo_journal, todo_result)
+
+        if tasks_changed:
+            self.sort_tasks()
+
+        # the merged records are journaled row by row; compaction happens only when the log is due
+        for journal, store in ((self.task_journal, self.tasks), (self.todo_journal, self.todos_list)):
+            if journal.needs_checkpoint():
+                self.write_journal(journal, store)
+
+        self.upload_tasks()
+        self.upload_todos()
+
+        # only after the merged records are queued for disk, so a crash cannot skip past them
+        self.task_journal.set_watermark(session.watermark("tasks"))
+        self.todo_journal.set_watermark(session.watermark("todos"))
+
+        self.start_listeners()
+
+    def apply_merge_result(self, store, journal, result):
+        changed = len(result.records) != len(store) or any(
+            a is not b for a, b in zip(result.records, store)
+        )
+
+        before = store.by_id
+
+        if changed:
+            in_sync = {r["id"] for r in result.in_sync}
+            dirty   = store.dirty - in_sync
+            deleted = store.deleted
+
+            store.replace_all(result.records)
+            store.mark_dirty(dirty & set(store.by_id))
+            store.add_tombstones(deleted)
+
+        store.mark_dirty(result.upload)
+        store.add_tombstones(result.deleted)
+        store.drop_tombstones(result.gone)
+
+        # acknowledged first: records that arrived from the cloud are then already bases,
+        # so journaling them as puts restores them on replay without queueing an upload
+        journal.acknowledge([r for r in result.in_sync if journal.bases.get(r["id"]) != r], result.gone)
+
+        arrived = [r for r in result.in_sync if before.get(r["id"]) is not r]
+
+        journal.append(
+            changed=arrived + [store.by_id[i] for i in result.upload
+                               if journal.outbox.get(i) != store.by_id[i].get("rev", 0)],
+            deleted=[i for i in result.deleted if i not in journal.tombstones]
+        )
+
+        return changed
 
     def init_firebase(self):
         if hasattr(self, "db") and self.db is not None:
             return
+
+        if self.init_thread:
+            return
         
         if not os.path.exists("firebase_key.json"):
             self.key_missing    = True
@@ -114,21 +332,30 @@ class SyncMixin:
             self.set_cloud_status("offline")
             return
 
-        try:
-            if not firebase_admin._apps:
-                cred = credentials.Certificate("firebase_key.json")
-                firebase_admin.initialize_app(cred)
+        self.init_thread = FirebaseInitThread("firebase_key.json")
+        self.init_thread.ready.connect(self.on_firebase_initialized)
+        self.init_thread.failed.connect(self.on_firebase_init_failed)
+        self.init_thread.finished.connect(self.on_firebase_init_thread_finished)
+        self.init_thread.start()
 
-            self.db = firestore.client()
-            self.firebase_ready = True
+    def on_firebase_initialized(self, db, import_seconds):
+        print("Firebase loaded in the background, import took %dms" % (import_seconds * 1000))
 
-            self.run_firebase_check()
+        self.db = db
+        self.firebase_ready = True
 
-        except Exception as e:
-            print("Firebase init failed: ", e)
-            self.firebase_ready = False    
-            self.online         = False
-            self.set_cloud_status("offline")
+        self.run_firebase_check()
+
+    def on_firebase_init_failed(self, error):
+        print("Firebase init failed: ", error)
+        self.firebase_ready = False    
+        self.online         = False
+        self.set_cloud_status("offline")
+        self.schedule_retry()
+
+    def on_firebase_init_thread_finished(self):
+        self.init_thread.deleteLater()
+        self.init_thread = None
 
     def on_firebase_checked(self, connected):
          
@@ -136,32 +363,13 @@ class SyncMixin:
 
         if not connected:
             self.set_cloud_status("offline")
+            self.schedule_retry()
             return
         
-        cloud_tasks = self.get_cloud_tasks()
-        cloud_todos = self.get_cloud_todos()
-
-        cloud_task_ids = {t["id"] for t in cloud_tasks}
-        local_task_ids = {t["id"] for t in self.tasks}
-
-        cloud_todo_ids = {t["id"] for t in cloud_todos}
-        local_todo_ids = {t["id"] for t in self.todos_list}
-
-        if (cloud_task_ids != local_task_ids) or (cloud_todo_ids != local_todo_ids):
-            
-            if not hasattr(self, "sync_conflict_page"):
-                self.build_sync_conflict_page()
-
-            self.stack.setCurrentWidget(self.sync_conflict_page)
-            return    
-        
-        self.set_cloud_status("synced")
+        self.start_reconcile()
 
     def build_sync_conflict_page(self):
 
-        cloud_tasks = self.get_cloud_tasks()
-        cloud_todos = self.get_cloud_todos()
-
         self.sync_conflict_page = QWidget()         
         layout                  = QVBoxLayout(self.sync_conflict_page)
 
@@ -172,26 +380,19 @@ class SyncMixin:
         header.setAlignment(Qt.AlignCenter)
         header.setStyleSheet("font-size: 38px; font-family: segoe UI; color: yellow;")
 
-        text = (
-            f"Cloud and Local Data are different:\n\n"
-            f"Local Tasks: {len(self.tasks)}\t\tLocal Todos: {len(self.todos_list)}\n"
-            f"Cloud Tasks: {len(cloud_tasks)}\t\tCloud Todos: {len(cloud_todos)}\n\n"
-            f"Select Which section should use cloud data."
-        )
-
-        info = QLabel(text)
-        info.setWordWrap(True)
-        info.setStyleSheet("color : yellow; font-size: 25px;")
-        info.setAlignment(Qt.AlignCenter)
+        self.sync_info = QLabel()
+        self.sync_info.setWordWrap(True)
+        self.sync_info.setStyleSheet("color : yellow; font-size: 25px;")
+        self.sync_info.setAlignment(Qt.AlignCenter)
 
         self.task_radio_group = QButtonGroup(self)
         self.todo_radio_group = QButtonGroup(self)
 
-        self.task_radio_cloud = QRadioButton("Tasks: Load From CLoud")
-        self.task_radio_local = QRadioButton("Tasks: Keep Local Data")
+        self.task_radio_cloud = QRadioButton("Tasks: Use Cloud Version")
+        self.task_radio_local = QRadioButton("Tasks: Keep Local Version")
 
-        self.todo_radio_cloud = QRadioButton("Todos: Load From CLoud")
-        self.todo_radio_local = QRadioButton("Todos: Keep Local Data")
+        self.todo_radio_cloud = QRadioButton("Todos: Use Cloud Version")
+        self.todo_radio_local = QRadioButton("Todos: Keep Local Version")
 
         self.task_radio_group.addButton(self.task_radio_cloud)
         self.task_radio_group.addButton(self.task_radio_local)
@@ -204,16 +405,6 @@ class SyncMixin:
             
             radio.setStyleSheet("font-size: 26px; padding: 10px; color: lime;")
 
-        if len(cloud_tasks) >= len(self.tasks):
-            self.task_radio_cloud.setChecked(True)
-        else:
-            self.task_radio_local.setChecked(True)
-
-        if len(cloud_todos) >= len(self.todos_list):
-            self.todo_radio_cloud.setChecked(True)
-        else:
-            self.todo_radio_local.setChecked(True)            
-
         continue_btn = QPushButton("Continue")
         continue_btn.setObjectName("confirm_conflict")    
         continue_btn.clicked.connect(self.apply_sync)
@@ -239,7 +430,7 @@ class SyncMixin:
         hbox3.addWidget(self.todo_radio_local)
 
         layout.addWidget(header)
-        layout.addWidget(info)
+        layout.addWidget(self.sync_info)
         layout.addLayout(hbox1)
         layout.addLayout(hbox2)
         layout.addLayout(hbox3)
@@ -249,30 +440,41 @@ class SyncMixin:
 
         self.stack.addWidget(self.sync_conflict_page)
 
+    def update_sync_conflict_page(self, task_result, todo_result):
+        self.sync_info.setText(
+            f"Some items were changed both here and in the cloud:\n\n"
+            f"Conflicting Tasks: {len(task_result.conflicts)}\t\t"
+            f"Conflicting Todos: {len(todo_result.conflicts)}\n\n"
+            f"Everything else was merged automatically.\n"
+            f"Select Which version should win the conflicts."
+        )
+
+        self.task_radio_local.setChecked(True)
+        self.todo_radio_local.setChecked(True)
+
+        self.task_radio_cloud.setEnabled(bool(task_result.conflicts))
+        self.task_radio_local.setEnabled(bool(task_result.conflicts))
+        self.todo_radio_cloud.setEnabled(bool(todo_result.conflicts))
+        self.todo_radio_local.setEnabled(bool(todo_result.conflicts))
+
     def apply_sync(self):
 
-        cloud_tasks = self.get_cloud_tasks()
-        cloud_todos = self.get_cloud_todos()
+        session = self.reconcile_session
 
-        if self.task_radio_cloud.isChecked():
-            self.tasks = cloud_tasks
-        else:
-            local_ids  = {t["id"] for t in self.tasks}
-            self.delete_missing_cloud_docs("tasks", local_ids)    
+        if session is None or not session.is_fresh():
+            # the user sat on the page long enough for the cached cloud copy to go stale
+            self.sync_info.setText("The cloud copy is out of date, fetching it again...")
+            self.start_reconcile()
+            return
 
-        if self.todo_radio_cloud.isChecked():
-            self.todos_list = cloud_todos 
-        else:
-            local_ids  = {t["id"] for t in self.todos_list}
-            self.delete_missing_cloud_docs("todos", local_ids)    
+        task_prefer = "cloud" if self.task_radio_cloud.isChecked() else "local"
+        todo_prefer = "cloud" if self.todo_radio_cloud.isChecked() else "local"
 
-        self.task_radio_cloud.setChecked(False)       
-        self.task_radio_local.setChecked(False)
-        self.todo_radio_cloud.setChecked(False)
-        self.todo_radio_local.setChecked(False)
+        task_result, todo_result = self.merge_session(session, task_prefer, todo_prefer)
 
-        self.save_task_file()
-        self.save_todo_file()
+        # changes that arrived while the page was open were skipped; a fresh listener replays them
+        self.stop_listeners()
+        self.apply_merge(task_result, todo_result)
 
         self.back_to_menu()
 
@@ -283,57 +485,44 @@ class SyncMixin:
 
         if state == "synced":
             self.cloud_status.setText("☁ Cloud:\n   Synced")
-            self.cloud_status.setToolTip("Synced with firestore")
-            self.cloud_status.setStyleSheet("""
-                QLabel#cloud_status {
-                    font-size: 35px;
-                    padding: 6px 12px;
-                    background-color: rgba(0, 120, 0, 1);
-                    border-radius: 8px;
-                    color: white;
-                }
-
-                QLabel#cloud_status:hover{
-                    background-color: rgba(0, 120, 0, 0.5);
-                }                            
-                                                                        
-            """)
+            self.set_cloud_tooltip("Synced with firestore")
+            set_state(self.cloud_status, "synced")
 
         elif state == "syncing":
             self.cloud_status.setText("☁ Cloud:\n   Syncing…")
-            self.cloud_status.setToolTip("Syncing with firestore...")
-            self.cloud_status.setStyleSheet("""
-                QLabel#cloud_status {
-                    font-size: 35px;
-                    padding: 6px 12px;
-                    background-color: rgba(180, 140, 0, 1);
-                    border-radius: 8px;
-                    color: black;
-                }
-                                            
-                QLabel#cloud_status:hover{
-                    background-color: rgba(180, 140, 0, 0.6);
-                }    
-
-            """)
+            self.set_cloud_tooltip("Syncing with firestore...")
+            set_state(self.cloud_status, "syncing")
 
         else:
             self.cloud_status.setText("☁ Cloud:\n   Offline")
             if self.key_missing:
-                self.cloud_status.setToolTip("Firebase Key missing - Running Offline")
-            elif not self.net_manager.isOnline():
-                self.cloud_status.setToolTip("No Internet Connection")
+                self.set_cloud_tooltip("Firebase Key missing - Running Offline")
+            elif not self.connectivity.is_online():
+                self.set_cloud_tooltip("No Internet Connection")
+            else:
+                self.set_cloud_tooltip("Offline - changes are kept until the next sync")
+
+            set_state(self.cloud_status, "offline")
             
-            self.cloud_status.setStyleSheet("""
-                QLabel#cloud_status {
-                    font-size: 35px;
-                    padding: 6px 12px;
-                    background-color: rgba(150, 0, 0, 1);
-                    border-radius: 8px;
-                    color: white;
-                }
-                                            
-                QLabel#cloud_status:hover{
-                    background-color: rgba(150, 0, 0, 0.6);
-                }    
-            """)
+
+    def set_cloud_tooltip(self, note):
+        self.cloud_note = note
+        self.cloud_status.setToolTip(
+            note + "\n\n" + self.sync_engine.metrics.summary() + "\n\nRight-click to export metrics"
+        )
+
+    def show_cloud_menu(self, pos):
+        menu = QMenu(self)
+        menu.addAction("Export sync metrics", self.export_metrics)
+        menu.exec_(self.cloud_status.mapToGlobal(pos))
+
+    def export_metrics(self):
+        path = os.path.join(self.user_dir, METRICS_PATH)
+
+        try:
+            self.sync_engine.metrics.export(path)
+            print("Sync metrics written to", os.path.abspath(path))
+
+        except Exception as e:
+            print("Metrics export failed: ", e)
+
@@ -0,0 +1,170 @@
+from PyQt5.QtCore import QCoreApplication, QDeadlineTimer, QObject, QThreadPool, pyqtSignal
+
+from firebase_threads import UploadJob
+from manifest import manifest_delta
+from metrics import SyncMetrics
+
+
+STOP_WAIT = 5000
+
+
+class SyncEngine(QObject):
+    # One upload in flight per collection. Pushes that land while it runs only
+    # set `pending`, so a burst of edits goes out as a single follow-up upload.
+
+    status   = pyqtSignal(str)
+    uploaded = pyqtSignal(str, bool)
+
+    def __init__(self, window):
+        super().__init__(window)
+        self.window   = window
+        self.queues   = {}
+        self.accounts = {}
+        self.stopping = False
+
+        self.use_account(window.user_id)
+
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(2)
+
+    def use_account(self, user_id):
+        # metrics are kept per account; uploads retired by a switch report to the one they started in
+        self.metrics = self.accounts.setdefault(user_id, SyncMetrics())
+
+    def register(self, name, store, journal):
+        # a switch of account replaces the queue; uploads still in flight finish
+        # against the queue (and journal) they were started from
+        self.queues[name] = {
+            "name"    : name,
+            "store"   : store,
+            "journal" : journal,
+            "metrics" : self.metrics,
+            "job"     : None,
+            "changed" : [],
+            "deleted" : [],
+            "patches" : {},
+            "pending" : False,
+            "failed"  : False,
+        }
+
+    def ready(self):
+        return self.window.firebase_ready and self.window.online and not self.stopping
+
+    def push(self, name):
+        queue   = self.queues[name]
+        store   = queue["store"]
+        metrics = queue["metrics"]
+
+        metrics.queue_depth[name] = len(store.dirty) + len(store.deleted)
+
+        if not self.ready():
+            self.refresh_status()
+            return
+
+        if queue["job"]:
+            queue["pending"] = True
+            return
+
+        # a pull is being merged; apply_merge pushes again with the merged records
+        if self.window.reconciling():
+            return
+
+        if not store.has_changes():
+            self.refresh_status()
+            return
+
+        changed, deleted, patches = store.take_changes()
+        manifest                  = manifest_delta(changed, deleted, queue["journal"].bases)
+
+        queue["changed"] = changed
+        queue["deleted"] = deleted
+        queue["patches"] = patches
+
+        metrics.start(name)
+        metrics.queue_depth[name] = 0
+
+        queue["job"] = self.start_job(queue, changed, deleted, patches, manifest)
+
+        self.refresh_status()
+
+    def start_job(self, queue, changed, deleted, patches, manifest):
+        job = UploadJob(
+            changed, deleted, patches, manifest, queue["name"],
+            self.window.db, self.window.user_id, self.window.connectivity
+        )
+        job.signals.finished_upload.connect(
+            lambda name, ok, stats: self.on_job_finished(queue, ok, stats)
+        )
+
+        self.pool.start(job)
+        return job
+
+    def push_all(self):
+        for name in self.queues:
+            self.push(name)
+
+    def on_job_finished(self, queue, ok, stats):
+        name = queue["name"]
+
+        queue["metrics"].upload_finished(name, ok, stats)
+
+        changed, deleted, patches = queue["changed"], queue["deleted"], queue["patches"]
+
+        queue["job"]     = None
+        queue["changed"] = []
+        queue["deleted"] = []
+        queue["patches"] = {}
+        queue["failed"]  = not ok
+
+        if ok:
+            queue["journal"].acknowledge(changed, deleted)
+        else:
+            queue["store"].restore_changes(changed, deleted, patches)
+            queue["pending"] = False
+
+        if queue is not self.queues.get(name):
+            # retired by an account switch; whatever is left waits in that account's outbox
+            return
+
+        self.uploaded.emit(name, ok)
+
+        if queue["pending"]:
+            queue["pending"] = False
+            queue["metrics"].coalesced += 1
+            self.push(name)
+        else:
+            self.refresh_status()
+
+    def uploading(self, name):
+        queue = self.queues.get(name)
+
+        if queue is None or not queue["job"]:
+            return {}
+
+        return {item["id"]: item for item in queue["changed"]}
+
+    def busy(self):
+        return any(queue["job"] or queue["pending"] for queue in self.queues.values())
+
+    def refresh_status(self):
+        if not self.ready():
+            state = "offline"
+        elif self.busy():
+            state = "syncing"
+        elif any(queue["failed"] for queue in self.queues.values()):
+            state = "offline"
+        else:
+            state = "synced"
+
+        self.status.emit(state)
+
+    def stop(self):
+        # finished uploads report back through queued signals, so events keep being
+        # processed while waiting; their acks must land before the disk writer stops
+        self.stopping = True
+        deadline      = QDeadlineTimer(STOP_WAIT)
+
+        while not self.pool.waitForDone(50) and not deadline.hasExpired():
+            QCoreApplication.processEvents()
+
+        QCoreApplication.processEvents()
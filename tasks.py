@@ -1,66 +1,34 @@
 
-import os
 import datetime
-import json
 import uuid
-from functools import partial
 
 
 from PyQt5.QtWidgets import (
      QWidget, QLabel, QLineEdit,
     QVBoxLayout, QHBoxLayout, QPushButton,
-     QScrollArea, QMessageBox,
-     QSizePolicy,
-    QToolTip
+     QMessageBox
 )
 from PyQt5.QtCore import QTimer, Qt
 
+from records import RecordStore
+from list_views import RecordListView, TaskViewDelegate, TaskCompleteDelegate
 
 class TasksMixin:
     def load_tasks(self):
-        file_path  = "tasks.json"
-        self.tasks = []
+        self.task_journal = self.open_journal("tasks")
+        self.tasks        = RecordStore(
+            self.task_journal.load(), self.task_journal.outbox, self.task_journal.tombstones
+        )
 
-        try:        
-            if os.path.exists(file_path):
-                with open(file_path, "r") as f:
-                    self.tasks = json.load(f)
+        self.sort_tasks()
+        self.task_model.reset(self.tasks)
 
-        except Exception:
-            self.tasks = []                                        
+        self.sync_engine.register("tasks", self.tasks, self.task_journal)
 
-        self.sort_tasks()   
-
-    def load_tasks_from_firebase(self):
-        if not hasattr(self, "db") or self.db is None:
-            return
-        
-        try:
-            docs = (
-                self.db.collection("users")
-                .document(self.user_id)
-                .collection("tasks")
-                .stream()
-            )    
-
-            cloud_tasks = [doc.to_dict() for doc in docs]
-
-            if cloud_tasks:
-                self.tasks = cloud_tasks
-                self.sort_tasks()
-                self.cloud_dirty = False
-
-                with open("tasks.json", "w") as f:
-                    json.dump(self.tasks, f, indent=4)
-
-        except Exception:
-            self.set_cloud_status("offline")  
+        if self.task_journal.needs_checkpoint():
+            self.write_journal(self.task_journal, self.tasks)
 
     def build_add_task_page(self):
-        if hasattr(self, "add_page"):
-            self.stack.setCurrentWidget(self.add_page)
-            return
-        
         self.add_page = QWidget()
         self.add_layout = QVBoxLayout(self.add_page)
         self.add_layout.setContentsMargins(0, 0, 0, 0)
@@ -121,8 +89,7 @@ class TasksMixin:
         self.add_layout.addWidget(self.container_add, alignment=Qt.AlignCenter)
 
     def open_add_task_page(self):
-        if self.add_page not in [self.stack.widget(i) for i in range(self.stack.count())]:
-            self.stack.addWidget(self.add_page)
+        self.ensure_page("add_page", self.build_add_task_page)
 
         self.stack.setCurrentWidget(self.add_page)
 
@@ -152,9 +119,9 @@ class TasksMixin:
             "priority" : False,
             "order" : len(self.tasks)
         }
-        self.tasks.append(task)
+        task = self.tasks.add(task)
 
-        self.save_task_file()
+        self.save_task_file(changed=[task])
         self.title.clear()
         self.deadline.clear()
 
@@ -169,11 +136,6 @@ class TasksMixin:
             return False     
 
     def build_view_task_page(self):
-
-        if hasattr(self, "view_page"):
-            self.stack.setCurrentWidget(self.view_page)
-            return
-            
         self.view_page = QWidget()
         self.view_layout = QHBoxLayout(self.view_page)
         self.view_layout.setContentsMargins(0, 100, 0, 0)
@@ -216,46 +178,19 @@ class TasksMixin:
         
         container_layout.addLayout(header_layout)
 
-        self.scroll_view = QScrollArea()
-        self.scroll_view.setWidgetResizable(True)
-        self.scroll_view.setHorizontalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
-
-        self.scroll_view.setStyleSheet("""
-                    QScrollArea {
-                        background: transparent;
-                        border: none;
-                    }
-                    QScrollArea > QWidget > QWidget {
-                        background: transparent;
-                    }
-                    QScrollBar:vertical {
-                        width: 10px;
-                        background: transparent;
-                    }
-                    QScrollBar::handle:vertical {
-                        background: rgba(255,255,255,0.4);
-                        border-radius: 5px;
-                    }
-                """)
-        
-        self.scroll_content_view = QWidget()
-        self.scroll_layout_view = QVBoxLayout(self.scroll_content_view)
-        self.scroll_layout_view.setAlignment(Qt.AlignTop)
-        self.scroll_layout_view.setContentsMargins(0, 0, 0, 0)  
-        self.scroll_layout_view.setSpacing(12)
-        
-        self.scroll_view.setWidget(self.scroll_content_view)
+        self.task_view_delegate = TaskViewDelegate(self)
+        self.task_view_delegate.clicked.connect(self.on_task_view_clicked)
+
+        self.task_list_view = RecordListView(self.task_model, self.task_view_delegate)
 
-        container_layout.addWidget(self.scroll_view)
+        container_layout.addWidget(self.task_list_view)
 
         self.view_layout.addWidget(self.container_view)
         self.view_layout.addStretch() 
 
     def open_view_task_page(self):
-        if self.view_page not in [self.stack.widget(i) for i in range(self.stack.count())]:
-            self.stack.addWidget(self.view_page)     
+        self.ensure_page("view_page", self.build_view_task_page)
 
-        self.refresh_tasks()
         self.stack.setCurrentWidget(self.view_page)
 
         if hasattr(self, "header"):
@@ -272,143 +207,11 @@ class TasksMixin:
             self.done_h_view.setText("Status")
             self.edit_h.show()       
 
-    def refresh_tasks(self):
-        self.clear_layout(self.scroll_layout_view)  
-
-        self.edit_buttons.clear()
-
-        self.scroll_layout_view.setSpacing(12)
-
-        for index,task in enumerate(self.tasks):
-            
-            try:
-                task_date = datetime.datetime.strptime(task["deadline"],"%d-%m-%Y").date()
-            except ValueError:
-                task_date = None
-
-            today = datetime.date.today()
-
-            if task_date and not task["completed"] :
-                days_left = (task_date - today).days
-                
-                if days_left < 0:
-                    color = "red"
-                    text  = f"Deadline: {task['deadline']}\nOverdue by:\n{abs(days_left)} days!!"
-                elif days_left == 0:
-                    color = "orange"
-                    text  = f"Deadline: {task['deadline']}\nDue Today!!"   
-                elif days_left <= 2:
-                    color = "yellow"
-                    text  = f"Deadline: {task['deadline']}\nDue in {days_left} days"
-                else:
-                    color = "white" 
-                    text  = f"Deadline: {task['deadline']}\nTime Remaining:\n {days_left} days"       
-            else:
-                color = "lime"
-                text  = f"Deadline: {task['deadline']}\nTask Completed✅"    
-
-            row = QWidget()    
-            row_layout = QHBoxLayout(row)
-            row_layout.setContentsMargins(7, 7, 7, 7)
-
-            title = QLabel()
-            title.setObjectName("title_view")
-            title.setMouseTracking(True)
-
-            deadline = QLabel(text)
-            status = QLabel("✅" if task["completed"] else "❌")
-
-            edit = QPushButton("📝")
-            edit.setObjectName("edit_view")
-            
-            edit.clicked.connect(partial(self.open_edit_task_page, index))
-            self.edit_buttons.append(edit)    
-
-            if task["priority"]:
-                row.setStyleSheet("""
-                                  QWidget{
-                                  background-color : rgba(255, 215, 0, 0.7);
-                                  border : 2px solid gold;
-                                  border-radius : 10px;
-                                  }""")
-            else:
-                row.setStyleSheet("""
-                                  QWidget{
-                                  background-color : rgba(0, 0, 0, 0.5);
-                                  }""")
-
-            for w in (deadline, status):
-                w.setStyleSheet(f"font-size: 33px; border: 2px solid white; border-radius : 10px; color: {color};font-family : Segoe UI;font-weight: bold;background-color : rgba(0, 0, 0, 0.5);")
-                w.setAlignment(Qt.AlignCenter)
-
-            title.setStyleSheet(f"""
-                QLabel#title_view {{
-                    font-size: 33px;
-                    border: 2px solid white;
-                    border-radius: 10px;
-                    color: {color};
-                    font-family: Segoe UI;
-                    font-weight: bold;
-                    background-color: rgba(0, 0, 0, 0.5);
-                    padding-left: 6px;
-                }}
-
-                QLabel#title_view:hover {{
-                    background-color:rgba(255, 255, 255, 0.2);
-                }}
-            """)    
-
-            title.setAlignment(Qt.AlignLeft | Qt.AlignVCenter) 
-            title.setSizePolicy(QSizePolicy.Fixed, QSizePolicy.Preferred) 
-            title.setFixedWidth(265)
-            title.adjustSize()
-
-            text = f"{index+1}. {task['title']}"
-
-            fm = title.fontMetrics()
-            elided = fm.elidedText(text, Qt.ElideRight, title.width())
-            
-            title.setText(elided)
-            title.setToolTip(text)
-            title.setCursor(Qt.PointingHandCursor) 
-
-            title.enterEvent = lambda e, t=title: QToolTip.showText(
-                t.mapToGlobal(t.rect().bottomLeft()),
-                t.toolTip(),
-                t
-            )
-            title.leaveEvent = lambda e: QToolTip.hideText()   
-
-            deadline.setStyleSheet(f"border-radius : 10px; font-size: 23px; border: 2px solid white; color: {color};font-family : Segoe UI;font-weight: bold; background-color : rgba(0, 0, 0, 0.5);")    
-
-            edit.setStyleSheet("""QPushButton#edit_view{
-                               font-size: 90px;font-family : Segoe UI;
-                               font-weight: bold;background-color : rgba(31, 41, 51, 0.9);
-                               border-radius : 10px; border : 2px solid white;
-                               }
-                               
-                               QPushButton#edit_view:hover{
-                                  background-color:rgba(255, 255, 255, 0.2);  
-                               }
-                               
-                               """)
-            
-
-            row_layout.addWidget(title)
-            row_layout.addWidget(deadline)
-            row_layout.addWidget(status)
-            row_layout.addWidget(edit)
-
-            self.scroll_layout_view.addWidget(row) 
-
-        self.scroll_layout_view.addStretch()         
+    def on_task_view_clicked(self, row, cell):
+        if cell == "edit":
+            self.open_edit_task_page(row)
 
     def build_edit_task_page(self):
-
-        if hasattr(self, "edit_page"):
-            self.stack.setCurrentWidget(self.edit_page)
-            return
-
         self.edit_page = QWidget()
         self.edit_layout = QVBoxLayout(self.edit_page)
 
@@ -504,14 +307,14 @@ class TasksMixin:
         if index < 0 or index >= len(self.tasks):
             return
 
-        self.current_task_index = index
+        self.ensure_page("edit_page", self.build_edit_task_page)
+
+        # kept by id: a remote change merged while the page is open can re-sort the rows
+        self.current_task_id = self.tasks[index]["id"]
 
         self.edit_title.setText(self.tasks[index]["title"])
         self.edit_deadline.setText(self.tasks[index]["deadline"])
 
-        if self.edit_page not in [self.stack.widget(i) for i in range(self.stack.count())]:
-            self.stack.addWidget(self.edit_page)
-
         self.stack.setCurrentWidget(self.edit_page)
 
         if hasattr(self, "header"):
@@ -531,19 +334,18 @@ class TasksMixin:
             QTimer.singleShot(2000,lambda: hasattr(self, "save_button") and self.save_button.setText("Save📁"))
             return
         
-        self.tasks[self.current_task_index]["title"] = new_title
-        self.tasks[self.current_task_index]["deadline"] = new_deadline
+        index = self.tasks.index_of(self.current_task_id)
+        if index < 0:
+            # removed on another device while it was being edited
+            self.open_view_task_page()
+            return
+
+        task = self.tasks.update(index, title=new_title, deadline=new_deadline)
         
-        self.save_task_file()
-        self.refresh_tasks()
+        self.save_task_file(changed=[task])
         self.open_view_task_page()
 
     def build_complete_task_page(self):
-
-        if hasattr(self, "complete_page"):
-            self.stack.setCurrentWidget(self.complete_page)
-            return
-
         self.complete_page = QWidget()
         self.complete_layout =  QHBoxLayout(self.complete_page)
         self.complete_layout.setContentsMargins(0, 110, 0, 0)
@@ -579,46 +381,19 @@ class TasksMixin:
 
         container_layout.addLayout(header_layout)
 
-        self.scroll_complete = QScrollArea()
-        self.scroll_complete.setWidgetResizable(True)
-        self.scroll_complete.setHorizontalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
-
-        self.scroll_complete.setStyleSheet("""
-                    QScrollArea {
-                        background: transparent;
-                        border: none;
-                    }
-                    QScrollArea > QWidget > QWidget {
-                        background: transparent;
-                    }
-                    QScrollBar:vertical {
-                        width: 10px;
-                        background: transparent;
-                    }
-                    QScrollBar::handle:vertical {
-                        background: rgba(255,255,255,0.4);
-                        border-radius: 5px;
-                    }
-                """)
-        
-        self.scroll_content_complete = QWidget()
-        self.scroll_layout_complete = QVBoxLayout(self.scroll_content_complete)
-        self.scroll_layout_complete.setAlignment(Qt.AlignTop)
-        self.scroll_layout_complete.setContentsMargins(0, 0, 0, 0)
-        self.scroll_layout_complete.setSpacing(20)
+        self.task_complete_delegate = TaskCompleteDelegate(self)
+        self.task_complete_delegate.clicked.connect(self.on_task_complete_clicked)
 
-        self.scroll_complete.setWidget(self.scroll_content_complete)
+        self.task_complete_view = RecordListView(self.task_model, self.task_complete_delegate)
 
-        container_layout.addWidget(self.scroll_complete)
+        container_layout.addWidget(self.task_complete_view)
 
         self.complete_layout.addWidget(self.container_complete)
         self.complete_layout.addStretch()            
 
     def open_complete_task_page(self):
-        if self.complete_page not in [self.stack.widget(i) for i in range(self.stack.count())]:
-            self.stack.addWidget(self.complete_page)
+        self.ensure_page("complete_page", self.build_complete_task_page)
 
-        self.refresh_comp_tasks()
         self.stack.setCurrentWidget(self.complete_page)
 
         if hasattr(self, "header"):
@@ -634,180 +409,43 @@ class TasksMixin:
             self.status_h_comp.setText("Toggle Status")    
             self.priority_h_comp.setText( "Prioritize" )      
 
-    def refresh_comp_tasks(self):
-        self.clear_layout(self.scroll_layout_complete)   
-
-        self.scroll_layout_complete.setSpacing(20)
-
-        for index, task in enumerate(self.tasks):
-
-            row = QWidget()
-            row.setFixedHeight(80)
-            row_layout = QHBoxLayout(row)
-            row_layout.setContentsMargins(4, 4, 4, 4)
-            row_layout.setSpacing(7)
-
-            title = QLabel()
-            title.setObjectName("title_comp")
-            title.setMouseTracking(True)
-            title.setFixedHeight(70)
-            title.setFixedWidth(310)
-            title.adjustSize()
-            text = f"{index+1}. {task['title']}"
-
-            status = QPushButton("✅" if task["completed"] else "❌")
-            status.setObjectName("status_comp")
-            status.setFixedHeight(70)
-
-            priority = QPushButton("💡" if task["priority"] else "⭕")
-            priority.setFixedHeight(70)
-            priority.setCheckable(True)
-            priority.setObjectName("priorityBtn")
-
-            status.clicked.connect(partial(self.toggle_status_task, index, status))
-            priority.toggled.connect(lambda checked, t=task: self.set_priority(t))
-
-            try:
-                task_date = datetime.datetime.strptime(task["deadline"],"%d-%m-%Y").date()
-            except ValueError:
-                task_date = None
-
-            today = datetime.date.today()    
-
-            if task_date and not task["completed"] :
-                border = "red"
-                days_left = (task_date - today).days
-                
-                if days_left < 0:
-                    color = "red"
-                elif days_left <= 2:
-                    color = "yellow"
-                else:
-                    color = "white"        
-            else:
-                color = "lime" 
-                border = "lime"   
-
-            if task["priority"]:
-                row.setStyleSheet("""
-                                  QWidget{
-                                  background-color : rgba(255, 215, 0, 0.4);
-                                  border : 3px solid gold;
-                                  border-radius : 10px;
-                                  }""")
-            else:
-                row.setStyleSheet("""
-                                  QWidget{
-                                  background-color : rgba(0, 0, 0, 0.5);
-                                  }""")    
-
-            title.setStyleSheet(f"""
-                QLabel#title_comp {{
-                    font-size: 33px;
-                    border: 2px solid white;
-                    border-radius: 10px;
-                    color: {color};
-                    font-family: Segoe UI;
-                    font-weight: bold;
-                    background-color: rgba(0, 0, 0, 0.5);
-                    padding-left: 6px;
-                }}
-
-                QLabel#title_comp:hover {{
-                    background-color:rgba(255, 255, 255, 0.2);
-                }}
-            """) 
-
-            title.setSizePolicy(QSizePolicy.Fixed, QSizePolicy.Preferred)    
-
-            status.setStyleSheet(f"""QPushButton#status_comp{{
-                                font-size: 28px; border : 4px solid {border};
-                                border-radius : 10px; background-color : rgba(0, 0, 0, 0.5);
-                                }}
-
-                                QPushButton#status_comp:hover{{
-                                    background-color:rgba(255, 255, 255, 0.2);
-                                }} 
-                                 
-                                 """)
-            
-            
-            priority.setStyleSheet("""
-                                QPushButton#priorityBtn {
-                                background-color : rgba(0, 0, 0, 0.5);
-                                font-size: 28px;   
-                                border-radius : 10px;   
-                                border : 4px solid gold;   
-                                }
-
-                                QPushButton#priorityBtn:hover{
-                                    background-color:rgba(255, 255, 255, 0.2);   
-                                }      
-
-                                """)
-
-            title.   setAlignment(Qt.AlignVCenter | Qt.AlignLeft)
-            fm = title.fontMetrics()
-            elided = fm.elidedText(text, Qt.ElideRight, title.width())
-            
-            title.setText(elided)
-            title.setToolTip(text)
-            title.setCursor(Qt.PointingHandCursor) 
-
-            title.enterEvent = lambda e, t=title: QToolTip.showText(
-                t.mapToGlobal(t.rect().bottomLeft()),
-                t.toolTip(),
-                t
-            )
-            title.leaveEvent = lambda e: QToolTip.hideText()  
-       
-            row_layout.addWidget(  title )
-            row_layout.addWidget( status )
-            row_layout.addWidget(priority)
-
-            self.scroll_layout_complete.addWidget(row)
+    def on_task_complete_clicked(self, row, cell):
+        if cell == "status":
+            self.toggle_status_task(row)
 
-        self.scroll_layout_complete.addStretch()      
+        elif cell == "priority" and row < len(self.tasks):
+            self.set_priority(self.tasks[row])
 
     def sort_tasks(self):
-        prioritized = [x for x in self.tasks if x["priority"]]
-        normal      = [x for x in self.tasks if not x["priority"]]
-
-        prioritized.sort(key=lambda x: x["order"])         
-        normal.sort(key=lambda x: x["order"])
-
-        self.tasks = prioritized + normal
+        self.tasks.sort(key=lambda x: (not x["priority"], x["order"]))
 
     def set_priority(self, task):
 
-        task["priority"] = not task["priority"]
+        index = self.tasks.index_of(task["id"])
+        if index < 0:
+            return
+
+        task = self.tasks.update(index, priority=not self.tasks[index]["priority"])
 
-           
-        self.save_task_file()
-        self.refresh_comp_tasks()
+        self.save_task_file(changed=[task])
 
-    def toggle_status_task(self,i, button):
+    def toggle_status_task(self, i):
         if i < 0 or i >= len(self.tasks):
             return
         
-        self.tasks[i]["completed"] = not self.tasks[i]["completed"]
-
-        if self.tasks[i]["completed"] :   
-            button.setText("✅")
-        else:
-            button.setText("❌")   
+        task = self.tasks.update(i, completed=not self.tasks[i]["completed"])
 
-        self.save_task_file()
-        self.refresh_comp_tasks()
-        self.open_complete_task_page()
+        self.save_task_file(changed=[task])
 
     def delete_task_index(self):
-        if not hasattr(self, "current_task_index"):
+        if not hasattr(self, "current_task_id"):
             return
         
-        index = self.current_task_index
-        
-        del self.tasks[index]
-        self.save_task_file()
-        self.refresh_tasks()
+        index = self.tasks.index_of(self.current_task_id)
+        if index < 0:
+            self.open_view_task_page()
+            return
+
+        task = self.tasks.remove(index)
+        self.save_task_file(deleted=[task["id"]])
         self.open_view_task_page()
@@ -0,0 +1,70 @@
+from journal import Journal
+
+
+def journal(tmp_path, **kwargs):
+    return Journal(str(tmp_path / "tasks.json"), **kwargs)
+
+
+def task(record_id, rev=1, **fields):
+    return {"id": record_id, "title": record_id, "rev": rev, **fields}
+
+
+def test_appends_replay_in_order(tmp_path):
+    j = journal(tmp_path)
+    j.load()
+
+    j.append([task("a"), task("b")])
+    j.append([task("a", rev=2, title="edited")])
+    j.append(deleted=["b"])
+
+    assert journal(tmp_path).load() == [task("a", rev=2, title="edited")]
+
+
+def test_checkpoint_compacts_the_log(tmp_path):
+    j = journal(tmp_path, checkpoint_every=3)
+    j.load()
+
+    records = [task(str(i)) for i in range(3)]
+    j.append(records)
+
+    assert j.needs_checkpoint()
+    j.checkpoint(records)
+
+    assert (tmp_path / "tasks.journal").read_text() == ""
+    assert not j.needs_checkpoint()
+
+    loaded = journal(tmp_path)
+    assert loaded.load() == records
+    assert loaded.outbox == {"0": 1, "1": 1, "2": 1}
+
+
+def test_torn_tail_is_truncated_so_later_appends_survive(tmp_path):
+    j = journal(tmp_path)
+    j.load()
+    j.append([task("a")])
+
+    with open(tmp_path / "tasks.journal", "a") as f:
+        f.write('{"op": "put", "item": {"id": "b"')
+
+    second = journal(tmp_path)
+    assert second.load() == [task("a")]
+
+    second.append([task("c")])
+
+    assert journal(tmp_path).load() == [task("a"), task("c")]
+
+
+def test_missing_final_newline_is_restored(tmp_path):
+    j = journal(tmp_path)
+    j.load()
+    j.append([task("a")])
+
+    log = tmp_path / "tasks.journal"
+    log.write_text(log.read_text().rstrip("\n"))
+
+    second = journal(tmp_path)
+    assert second.load() == [task("a")]
+
+    second.append([task("b")])
+
+    assert journal(tmp_path).load() == [task("a"), task("b")]
@@ -0,0 +1,98 @@
+from manifest import (
+    BUCKETS, bucket_of, record_hash, combined, manifest_of, manifest_delta, differing_buckets, upload_id
+)
+
+
+def task(record_id, **fields):
+    return {"id": record_id, "title": record_id, "completed": False, **fields}
+
+
+def apply(manifest, delta):
+    out = {"hash": manifest["hash"] + delta["hash"], "count": manifest["count"] + delta["count"], "buckets": {}}
+
+    for name in set(manifest["buckets"]) | set(delta["buckets"]):
+        have = manifest["buckets"].get(name, {"hash": 0, "count": 0})
+        add  = delta["buckets"].get(name, {"hash": 0, "count": 0})
+        total = {"hash": have["hash"] + add["hash"], "count": have["count"] + add["count"]}
+
+        # an emptied bucket reads the same as a missing one
+        if total["hash"] or total["count"]:
+            out["buckets"][name] = total
+
+    return out
+
+
+EMPTY = {"hash": 0, "count": 0, "buckets": {}}
+
+
+def test_bucket_of_is_a_hex_digit():
+    assert all(bucket_of("task-%d" % i) in BUCKETS for i in range(100))
+
+
+def test_record_hash_ignores_sync_metadata():
+    record = task("a")
+
+    assert record_hash(record) == record_hash({**record, "rev": 9, "updated_at": 5.0, "synced_at": "x", "bucket": "3"})
+    assert record_hash(record) != record_hash({**record, "title": "changed"})
+
+
+def test_manifest_of_sums_buckets():
+    manifest = manifest_of([task("a"), task("b"), task("c")])
+
+    assert manifest["count"] == 3
+    assert manifest["hash"] == sum(b["hash"] for b in manifest["buckets"].values())
+    assert sum(b["count"] for b in manifest["buckets"].values()) == 3
+
+
+def test_delta_for_edit_add_and_delete():
+    old    = [task("a"), task("b"), task("c")]
+    bases  = {r["id"]: r for r in old}
+    edited = task("a", title="edited")
+    added  = task("d")
+
+    delta = manifest_delta([edited, added], ["b"], bases)
+
+    assert apply(manifest_of(old), delta) == apply(manifest_of([edited, task("c"), added]), EMPTY)
+
+
+def test_delta_of_nothing_is_empty():
+    assert manifest_delta([], [], {}) == EMPTY
+
+
+def test_equal_manifests_do_not_differ():
+    records = [task("a"), task("b")]
+
+    assert differing_buckets(manifest_of(records), manifest_of(records)) == []
+
+
+def test_only_the_edited_bucket_differs():
+    records = [task("record-%d" % i) for i in range(50)]
+    edited  = records[:7] + [task("record-7", title="edited")] + records[8:]
+
+    assert differing_buckets(manifest_of(records), manifest_of(edited)) == [bucket_of("record-7")]
+
+
+def test_missing_buckets_count_as_empty():
+    assert differing_buckets(manifest_of([task("a")]), {"hash": 0, "count": 0}) == [bucket_of("a")]
+
+
+def test_bases_plus_changes_match_the_new_manifest():
+    old    = [task("record-%d" % i) for i in range(20)]
+    bases  = {r["id"]: r for r in old}
+    edited = task("record-4", title="edited")
+    new    = [edited if r["id"] == "record-4" else r for r in old if r["id"] != "record-9"]
+
+    expected = combined(manifest_of(old), manifest_delta([edited], ["record-9"], bases))
+
+    assert differing_buckets(expected, manifest_of(new)) == []
+    assert differing_buckets(manifest_of(old), manifest_of(new)) != []
+
+
+def test_upload_id_is_stable_for_the_same_upload():
+    bases = {"a": task("a", rev=1)}
+    edit  = [task("a", title="new", rev=2)]
+    delta = manifest_delta(edit, ["b"], bases)
+
+    assert upload_id(edit, ["b"], delta) == upload_id(list(edit), ["b"], manifest_delta(edit, ["b"], dict(bases)))
+    assert upload_id(edit, ["b"], delta) != upload_id([task("a", title="new", rev=3)], ["b"], delta)
+    assert upload_id(edit, ["b"], delta) != upload_id(edit, [], manifest_delta(edit, [], bases))
@@ -0,0 +1,146 @@
+from merge import merge_collection, merge_fields
+
+
+def task(record_id, rev=1, updated_at=1.0, **fields):
+    return {"id": record_id, "title": record_id, "completed": False, "rev": rev, "updated_at": updated_at, **fields}
+
+
+def test_identical_sides_are_in_sync():
+    record = task("a")
+
+    result = merge_collection([record], [dict(record)], {"a": record}, set())
+
+    assert result.records == [record]
+    assert [r["id"] for r in result.in_sync] == ["a"]
+    assert result.upload == [] and result.conflicts == []
+
+
+def test_edits_to_different_fields_merge():
+    base  = task("a")
+    local = task("a", rev=2, title="local")
+    cloud = task("a", rev=2, completed=True)
+
+    result = merge_collection([local], [cloud], {"a": base}, set())
+
+    merged = result.records[0]
+    assert merged["title"] == "local" and merged["completed"] is True
+    assert result.upload == ["a"] and result.conflicts == []
+
+
+def test_same_field_edited_on_both_sides_is_a_conflict():
+    base  = task("a")
+    local = task("a", rev=2, title="mine")
+    cloud = task("a", rev=2, title="theirs")
+
+    kept = merge_collection([local], [cloud], {"a": base}, set())
+    assert kept.conflicts == [("a", "edit", ["title"])]
+    assert kept.records[0]["title"] == "mine"
+
+    taken = merge_collection([local], [cloud], {"a": base}, set(), prefer="cloud")
+    assert taken.records[0]["title"] == "theirs"
+    assert [r["id"] for r in taken.in_sync] == ["a"]
+
+
+def test_merged_record_gets_a_new_rev():
+    base  = task("a", rev=1)
+    local = task("a", rev=2, title="local")
+    cloud = task("a", rev=3, completed=True)
+
+    merged, fields = merge_fields(base, local, cloud, None)
+
+    assert fields == []
+    assert merged["rev"] == 4
+
+
+def test_unknown_cloud_record_is_added():
+    cloud = task("b")
+
+    result = merge_collection([], [cloud], {}, set())
+
+    assert result.records == [cloud]
+    assert [r["id"] for r in result.in_sync] == ["b"]
+
+
+def test_new_local_record_is_uploaded():
+    local = task("a")
+
+    result = merge_collection([local], [], {}, set())
+
+    assert result.records == [local]
+    assert result.upload == ["a"]
+
+
+def test_incremental_pull_leaves_unchanged_records_alone():
+    local = task("a", rev=5, title="edited")
+
+    result = merge_collection([local], [], {"a": task("a")}, set(), complete=False)
+
+    assert result.records == [local]
+    assert result.upload == [] and result.gone == []
+
+
+def test_cloud_delete_marker_removes_unedited_record():
+    base = task("a")
+
+    result = merge_collection([dict(base)], [{"id": "a", "deleted": True}], {"a": base}, set(), complete=False)
+
+    assert result.records == []
+    assert result.gone == ["a"]
+
+
+def test_cloud_delete_of_locally_edited_record_is_a_conflict():
+    local = task("a", rev=2, title="edited")
+
+    result = merge_collection([local], [{"id": "a", "deleted": True}], {"a": task("a")}, set(), complete=False)
+
+    assert result.conflicts == [("a", "deleted in cloud", [])]
+    assert result.records == [local]
+
+
+def test_local_delete_is_shipped():
+    base = task("a")
+
+    result = merge_collection([], [dict(base)], {"a": base}, {"a"})
+
+    assert result.deleted == ["a"]
+    assert result.records == []
+
+
+def test_local_delete_of_cloud_edited_record_is_a_conflict():
+    cloud = task("a", rev=2, title="theirs")
+
+    result = merge_collection([], [cloud], {"a": task("a")}, {"a"}, prefer="cloud")
+
+    assert result.conflicts == [("a", "deleted locally", [])]
+    assert result.records == [cloud] and result.deleted == []
+
+
+def test_tombstone_missing_from_full_pull_is_gone():
+    result = merge_collection([], [], {}, {"a"})
+
+    assert result.gone == ["a"]
+
+
+def test_echo_of_in_flight_upload_keeps_newer_local_edit():
+    base  = task("a", rev=1, updated_at=1.0)
+    sent  = task("a", rev=2, updated_at=2.0, completed=True)
+    local = task("a", rev=3, updated_at=3.0)
+    echo  = dict(sent, synced_at="now", bucket="0")
+
+    result = merge_collection([local], [echo], {"a": base}, set(), complete=False, in_flight={"a": sent})
+
+    assert result.records[0]["completed"] is False
+    assert result.upload == ["a"] and result.in_sync == []
+    assert result.conflicts == []
+
+
+def test_in_flight_does_not_apply_to_other_cloud_versions():
+    base  = task("a", rev=1, updated_at=1.0)
+    sent  = task("a", rev=2, updated_at=2.0, completed=True)
+    local = dict(sent)
+    older = task("a", rev=2, updated_at=1.5, title="other device")
+
+    result = merge_collection([local], [older], {"a": base}, set(), complete=False, in_flight={"a": sent})
+
+    merged = result.records[0]
+    assert merged["completed"] is True and merged["title"] == "other device"
@@ -0,0 +1,58 @@
+from journal import Journal
+
+
+def journal(tmp_path, **kwargs):
+    return Journal(str(tmp_path / "tasks.json"), **kwargs)
+
+
+def task(record_id, rev=1, **fields):
+    return {"id": record_id, "title": record_id, "rev": rev, **fields}
+
+
+def test_replay_rebuilds_outbox_and_tombstones(tmp_path):
+    j = journal(tmp_path)
+    j.load()
+
+    j.append([task("a"), task("b", rev=3)])
+    j.append(deleted=["b"])
+
+    loaded = journal(tmp_path)
+    loaded.load()
+
+    assert loaded.outbox == {"a": 1}
+    assert loaded.tombstones == {"b"}
+
+
+def test_ack_makes_bases_and_clears_outbox(tmp_path):
+    j = journal(tmp_path)
+    j.load()
+
+    j.append([task("a"), task("b")], deleted=["c"])
+    j.acknowledge([task("a")], ["c"])
+
+    loaded = journal(tmp_path)
+    assert loaded.load() == [task("a"), task("b")]
+    assert loaded.bases == {"a": task("a")}
+    assert loaded.outbox == {"b": 1} and loaded.tombstones == set()
+
+
+def test_ack_of_an_older_rev_keeps_the_newer_edit_queued(tmp_path):
+    j = journal(tmp_path)
+    j.load()
+
+    j.append([task("a", rev=1)])
+    j.append([task("a", rev=2)])
+    j.acknowledge([task("a", rev=1)])
+
+    assert j.outbox == {"a": 2}
+
+
+def test_acked_ids_are_dropped_from_records_on_replay(tmp_path):
+    j = journal(tmp_path)
+    j.load()
+
+    j.append([task("a"), task("b")])
+    j.acknowledge([task("a"), task("b")])
+    j.acknowledge(ids=["b"])
+
+    assert journal(tmp_path).load() == [task("a")]
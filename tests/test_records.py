@@ -0,0 +1,134 @@
+from records import RecordStore
+
+
+def task(record_id, **fields):
+    return {"id": record_id, "title": record_id, "completed": False, **fields}
+
+
+def test_snapshot_is_not_affected_by_later_edits():
+    store = RecordStore([task("a"), task("b")])
+    snap  = store.snapshot()
+
+    store.update(0, title="edited")
+    store.add(task("c"))
+    store.remove(1)
+
+    assert [r["title"] for r in snap] == ["a", "b"]
+    assert [r["title"] for r in store] == ["edited", "c"]
+
+
+def test_list_is_copied_once_per_snapshot():
+    store = RecordStore([task("a")])
+    snap  = store.snapshot()
+
+    store.add(task("b"))
+    copied = store.records
+    store.add(task("c"))
+
+    assert copied is not snap
+    assert store.records is copied
+
+
+def test_update_replaces_the_record_instead_of_mutating_it():
+    store = RecordStore([task("a")])
+    old   = store[0]
+
+    new = store.update(0, completed=True)
+
+    assert old["completed"] is False
+    assert new is store[0] is store.by_id["a"]
+    assert new["rev"] == old.get("rev", 0) + 1
+
+
+def test_edits_mark_records_dirty():
+    store = RecordStore([task("a"), task("b")])
+
+    store.add(task("c"))
+    store.update(0, title="edited")
+    store.remove(1)
+
+    assert store.dirty == {"a", "c"}
+    assert store.deleted == {"b"}
+    assert store.has_changes()
+
+
+def test_readding_a_deleted_id_clears_its_tombstone():
+    store = RecordStore([task("a")])
+
+    store.remove(0)
+    store.add(task("a"))
+
+    assert store.deleted == set() and store.dirty == {"a"}
+
+
+def test_take_changes_hands_over_and_clears():
+    store = RecordStore([task("a"), task("b")])
+    store.update(0, title="edited")
+    store.remove(1)
+
+    changed, deleted, _ = store.take_changes()
+
+    assert [r["title"] for r in changed] == ["edited"]
+    assert deleted == ["b"]
+    assert not store.has_changes()
+
+
+def test_restore_changes_after_a_failed_upload():
+    store = RecordStore([task("a"), task("b")])
+    store.update(0, title="edited")
+    store.remove(1)
+
+    changed, deleted, patches = store.take_changes()
+    store.restore_changes(changed, deleted, patches)
+
+    assert store.dirty == {"a"} and store.deleted == {"b"}
+
+
+def test_restore_skips_records_removed_since():
+    store = RecordStore([task("a")])
+    store.update(0, title="edited")
+
+    changed, deleted, patches = store.take_changes()
+    store.remove(0)
+    store.restore_changes(changed, deleted, patches)
+
+    assert store.dirty == set() and store.deleted == {"a"}
+
+
+def test_constructor_drops_dirty_ids_without_a_record():
+    store = RecordStore([task("a")], dirty=["a", "ghost"], deleted=["b"])
+
+    assert store.dirty == {"a"} and store.deleted == {"b"}
+
+
+def test_updates_record_the_fields_they_changed():
+    store = RecordStore([task("a")])
+    store.update(0, completed=True, title="a")
+    store.update(0, priority=True)
+
+    _, _, patches = store.take_changes()
+
+    assert patches == {"a": ["completed", "priority"]}
+
+
+def test_added_and_reloaded_records_go_out_whole():
+    store = RecordStore([task("a")])
+    store.add(task("b"))
+    store.update(1, completed=True)
+    store.update(0, completed=True)
+    store.mark_dirty(["a"])
+
+    changed, _, patches = store.take_changes()
+
+    assert {r["id"] for r in changed} == {"a", "b"} and patches == {}
+
+
+def test_failed_patch_combines_with_newer_edits():
+    store = RecordStore([task("a")])
+    store.update(0, completed=True)
+
+    changed, deleted, patches = store.take_changes()
+    store.update(0, title="edited")
+    store.restore_changes(changed, deleted, patches)
+
+    assert store.patches == {"a": {"completed", "title"}}
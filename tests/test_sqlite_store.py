@@ -0,0 +1,101 @@
+import sqlite3
+
+from journal import Journal
+from sqlite_store import TASK_ORDER, SqliteJournal
+
+
+def journal(tmp_path, **kwargs):
+    return SqliteJournal(str(tmp_path / "tasks.json"), **kwargs)
+
+
+def task(record_id, rev=1, **fields):
+    return {"id": record_id, "title": record_id, "rev": rev, **fields}
+
+
+def test_appends_and_deletes_survive_a_reload(tmp_path):
+    j = journal(tmp_path)
+    j.load()
+
+    j.append([task("a"), task("b"), task("c")])
+    j.append([task("a", rev=2, title="edited")], ["b"])
+
+    loaded = journal(tmp_path)
+
+    assert loaded.load() == [task("a", rev=2, title="edited"), task("c")]
+    assert loaded.outbox == {"a": 2, "c": 1} and loaded.tombstones == {"b"}
+
+
+def test_ack_stores_bases_and_clears_the_outbox(tmp_path):
+    j = journal(tmp_path)
+    j.load()
+
+    j.append([task("a"), task("b")], ["c"])
+    j.acknowledge([task("a")], ["c"])
+    j.set_watermark("2026-01-01T00:00:00")
+
+    loaded = journal(tmp_path)
+    loaded.load()
+
+    assert loaded.bases == {"a": task("a")}
+    assert loaded.outbox == {"b": 1} and loaded.tombstones == set()
+    assert loaded.watermark == "2026-01-01T00:00:00"
+
+
+def test_checkpoint_writes_only_the_difference(tmp_path):
+    j = journal(tmp_path)
+    j.load()
+    j.append([task("a"), task("b")])
+
+    j.checkpoint([task("a", title="moved"), task("d")])
+
+    assert journal(tmp_path).load() == [task("a", title="moved"), task("d")]
+
+
+def test_first_start_imports_the_json_journal(tmp_path):
+    old = Journal(str(tmp_path / "tasks.json"))
+    old.load()
+    old.append([task("a"), task("b")], ["c"])
+    old.acknowledge([task("a")])
+
+    j = journal(tmp_path)
+
+    assert j.load() == [task("a"), task("b")]
+    assert j.bases == {"a": task("a")} and j.outbox == {"b": 1} and j.tombstones == {"c"}
+    assert journal(tmp_path).load() == [task("a"), task("b")]
+
+
+def test_tasks_load_in_list_order_through_the_index(tmp_path):
+    j = journal(tmp_path, order=TASK_ORDER)
+    j.load()
+
+    j.append([
+        task("a", priority=False, order=0),
+        task("b", priority=True,  order=2),
+        task("c", priority=False, order=1),
+        task("d", priority=True,  order=1),
+    ])
+
+    assert [r["id"] for r in journal(tmp_path, order=TASK_ORDER).load()] == ["d", "b", "a", "c"]
+
+    plan = j.conn.execute("EXPLAIN QUERY PLAN SELECT data FROM records ORDER BY " + TASK_ORDER).fetchall()
+    assert "records_listing" in plan[0][-1]
+
+
+def test_deadline_is_stored_as_an_iso_date(tmp_path):
+    j = journal(tmp_path)
+    j.load()
+    j.append([task("a", deadline="02-03-2026"), task("b", deadline="soon")])
+
+    assert dict(j.conn.execute("SELECT id, deadline FROM records")) == {"a": "2026-03-02", "b": None}
+
+
+def test_files_without_the_columns_are_upgraded(tmp_path):
+    conn = sqlite3.connect(str(tmp_path / "tasks.db"))
+    conn.execute("CREATE TABLE records (id TEXT PRIMARY KEY, data TEXT NOT NULL)")
+    conn.execute("INSERT INTO records VALUES ('a', '{\"id\": \"a\", \"priority\": true, \"order\": 4}')")
+    conn.commit()
+    conn.close()
+
+    j = journal(tmp_path)
+
+    assert j.conn.execute("SELECT priority, ord FROM records").fetchall() == [(1, 4)]
@@ -0,0 +1,88 @@
+import json
+
+from PyQt5.QtCore import QCoreApplication, QObject
+
+from records import RecordStore
+from settings import load_settings
+from storage import StorageMixin
+
+
+app = QCoreApplication.instance() or QCoreApplication([])
+
+
+class FakeJournal:
+    def __init__(self):
+        self.appends     = []
+        self.checkpoints = 0
+
+    def append(self, changed=(), deleted=()):
+        self.appends.append(([r["id"] for r in changed], list(deleted)))
+
+    def needs_checkpoint(self):
+        return False
+
+    def checkpoint(self, records):
+        self.checkpoints += 1
+
+
+class Window(StorageMixin, QObject):
+    def __init__(self, debounce):
+        super().__init__()
+        self.settings     = {"save_debounce": debounce}
+        self.tasks        = RecordStore([{"id": "a"}, {"id": "b"}, {"id": "c"}])
+        self.todos_list   = RecordStore()
+        self.task_journal = FakeJournal()
+        self.todo_journal = FakeJournal()
+        self.uploads      = []
+
+        self.start_save_debounce()
+
+    def upload_tasks(self):
+        self.uploads.append("tasks")
+
+    def upload_todos(self):
+        self.uploads.append("todos")
+
+
+def test_a_burst_of_edits_is_one_journal_write():
+    window = Window(300)
+
+    window.queue_save("tasks", [window.tasks[0]], [])
+    window.queue_save("tasks", [window.tasks[1], window.tasks[0]], [])
+    window.queue_save("tasks", [], ["b"])
+
+    assert window.task_journal.appends == [] and window.save_timer.isActive()
+
+    window.flush_saves()
+
+    assert window.task_journal.appends == [(["a"], ["b"])]
+    assert window.uploads == ["tasks"] and not window.save_timer.isActive()
+
+
+def test_flush_skips_stores_without_edits():
+    window = Window(300)
+
+    window.queue_save("todos", [], [])
+    window.flush_saves()
+
+    assert window.todo_journal.appends == [] and window.uploads == []
+
+
+def test_zero_debounce_writes_every_edit():
+    window = Window(0)
+
+    window.queue_save("tasks", [window.tasks[0]], [])
+    window.queue_save("tasks", [window.tasks[1]], [])
+
+    assert window.task_journal.appends == [(["a"], []), (["b"], [])]
+    assert window.task_journal.checkpoints == 0
+
+
+def test_save_debounce_comes_from_settings(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+
+    assert load_settings()["save_debounce"] == 300
+
+    (tmp_path / "settings.json").write_text(json.dumps({"save_debounce": 0}))
+
+    assert load_settings()["save_debounce"] == 0
@@ -0,0 +1,123 @@
+import datetime
+
+from PyQt5.QtCore import Qt
+from PyQt5.QtGui import QBrush, QColor, QFont, QPen
+
+
+FILLS = {
+    "dark"          : (0, 0, 0, 128),
+    "slate"         : (31, 41, 51, 230),
+    "hover"         : (255, 255, 255, 51),
+    "priority"      : (255, 215, 0, 180),
+    "priority_soft" : (255, 215, 0, 102),
+}
+
+# cloud badge states: background rgb, text color, hover alpha
+CLOUD_STATES = {
+    "init"    : ((0, 0, 0), "yellow", 1),
+    "synced"  : ((0, 120, 0), "white", 0.5),
+    "syncing" : ((180, 140, 0), "black", 0.6),
+    "offline" : ((150, 0, 0), "white", 0.6),
+}
+
+
+def days_left(task):
+    try:
+        return (datetime.datetime.strptime(task["deadline"], "%d-%m-%Y").date() - datetime.date.today()).days
+    except ValueError:
+        return None
+
+
+def task_state(task):
+    days = days_left(task)
+
+    if days is None or task["completed"]:
+        return "done"
+
+    if days < 0:
+        return "overdue"
+
+    if days == 0:
+        return "due_today"
+
+    return "due_soon" if days <= 2 else "pending"
+
+
+def brush(fill):
+    return QBrush(QColor(*FILLS[fill]))
+
+
+def compile_cell(spec):
+    font = QFont("Segoe UI")
+    font.setPixelSize(spec["size"])
+    font.setBold(True)
+
+    return {
+        "font"   : font,
+        "text"   : QPen(QColor(spec.get("color", "white"))),
+        "border" : QPen(QColor(spec["border"]), spec.get("width", 2)),
+        "fill"   : brush(spec.get("fill", "dark")),
+        "align"  : spec.get("align", Qt.AlignCenter),
+        "elide"  : spec.get("elide", False),
+    }
+
+
+def compile_theme(variants):
+    # every state variant becomes ready-made fonts, pens and brushes, once per delegate
+    return {state: {name: compile_cell(spec) for name, spec in cells.items()} for state, cells in variants.items()}
+
+
+def compile_rows(rows):
+    return {
+        state: (brush(fill), QPen(QColor(border), 2) if border else QPen(Qt.NoPen))
+        for state, (fill, border) in rows.items()
+    }
+
+
+LIST_STYLE = """
+        QListView {
+        background : transparent;
+        border : none;
+        }
+
+        QListView QScrollBar:vertical {
+        width : 10px;
+        background : transparent;
+        }
+
+        QListView QScrollBar::handle:vertical {
+        background : rgba(255, 255, 255, 0.4);
+        border-radius : 5px;
+        }
+"""
+
+
+def cloud_status_style():
+    rules = []
+
+    for state, ((r, g, b), color, hover) in CLOUD_STATES.items():
+        rules.append(f"""
+        QLabel#cloud_status[state="{state}"] {{
+        font-size : 35px;
+        padding : 6px 12px;
+        background-color : rgba({r}, {g}, {b}, 1);
+        border-radius : 8px;
+        color : {color};
+        }}
+
+        QLabel#cloud_status[state="{state}"]:hover {{
+        background-color : rgba({r}, {g}, {b}, {hover});
+        }}
+        """)
+
+    return "".join(rules)
+
+
+def set_state(widget, state):
+    # the rules are already parsed as part of the window stylesheet; only a re-polish is needed
+    if widget.property("state") == state:
+        return
+
+    widget.setProperty("state", state)
+    widget.style().unpolish(widget)
+    widget.style().polish(widget)
@@ -1,67 +1,34 @@
 
 
-import os
-
-import json
-
 import uuid
-from functools import partial
 
 
 
 from PyQt5.QtWidgets import (
      QWidget, QLabel, QLineEdit,
     QVBoxLayout, QHBoxLayout, QPushButton,
-   QScrollArea, QMessageBox,
- QSizePolicy,
-    QToolTip
+   QMessageBox
 )
 from PyQt5.QtCore import QTimer, Qt
 
+from records import RecordStore
+from list_views import RecordListView, TodoDelegate
+
 
 class TodosMixin:
     def load_todos(self):
-        file_path       = "todos.json"
-        self.todos_list = []
+        self.todo_journal = self.open_journal("todos")
+        self.todos_list   = RecordStore(
+            self.todo_journal.load(), self.todo_journal.outbox, self.todo_journal.tombstones
+        )
+        self.todo_model.reset(self.todos_list)
 
-        try:        
-            if os.path.exists(file_path):
-                with open(file_path, "r") as f:
-                    self.todos_list = json.load(f)  
+        self.sync_engine.register("todos", self.todos_list, self.todo_journal)
 
-        except Exception:
-            self.todos_list = []                                           
-
-    def load_todos_from_firebase(self):
-        if not hasattr(self, "db") or self.db is None:
-            return
-        
-        try:
-            docs = (
-                self.db.collection("users")
-                .document(self.user_id)
-                .collection("todos")
-                .stream()
-            )     
-
-            cloud_todos = [doc.to_dict() for doc in docs]
-
-            if cloud_todos:
-                self.todos_list = cloud_todos
-                self.cloud_dirty = False
-
-                with open("todos.json", "w") as f:
-                    json.dump(self.todos_list, f, indent=4)
-
-        except Exception:
-            self.set_cloud_status("offline")                          
+        if self.todo_journal.needs_checkpoint():
+            self.write_journal(self.todo_journal, self.todos_list)
 
     def build_todo_list_page(self):
-
-        if hasattr(self, "todo_page"):
-            self.stack.setCurrentWidget(self.todo_page)
-            return
-
         self.todo_page   = QWidget()
         self.todo_layout = QHBoxLayout(self.todo_page)
         self.todo_layout .setContentsMargins(0, 100, 0 ,0)
@@ -105,46 +72,19 @@ class TodosMixin:
 
         container_layout.addLayout(header_layout)  
 
-        self.scroll_todo = QScrollArea()
-        self.scroll_todo.setWidgetResizable(True)
-        self.scroll_todo.setHorizontalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
-
-        self.scroll_todo.setStyleSheet("""
-                    QScrollArea {
-                        background: transparent;
-                        border: none;
-                    }
-                    QScrollArea > QWidget > QWidget {
-                        background: transparent;
-                    }
-                    QScrollBar:vertical {
-                        width: 10px;
-                        background: transparent;
-                    }
-                    QScrollBar::handle:vertical {
-                        background: rgba(255,255,255,0.4);
-                        border-radius: 5px;
-                    }
-                """)
-
-        self.scroll_content_todo = QWidget()
-        self.scroll_layout_todo = QVBoxLayout(self.scroll_content_todo)
-        self.scroll_layout_todo.setAlignment(Qt.AlignTop)
-        self.scroll_layout_todo.setContentsMargins(0, 0, 0, 0)  
-        self.scroll_layout_todo.setSpacing(4)
-        
-        self.scroll_todo.setWidget(self.scroll_content_todo)
+        self.todo_delegate = TodoDelegate(self)
+        self.todo_delegate.clicked.connect(self.on_todo_clicked)
 
-        container_layout.addWidget(self.scroll_todo)
+        self.todo_list_view = RecordListView(self.todo_model, self.todo_delegate)
+
+        container_layout.addWidget(self.todo_list_view)
 
         self.todo_layout.addWidget(self.container_todo)
         self.todo_layout.addStretch()
 
     def open_todo_list_page(self):
-        if self.todo_page not in [self.stack.widget(i) for i in range(self.stack.count())]:
-            self.stack.addWidget(self.todo_page) 
+        self.ensure_page("todo_page", self.build_todo_list_page)
 
-        self.refresh_todos()
         self.stack.setCurrentWidget(self.todo_page)
 
         if hasattr(self, "header"):
@@ -160,124 +100,14 @@ class TodosMixin:
             self.status.setText("Toggle Status")
             self.edit.setText("Edit")     
 
-    def refresh_todos(self):
-        self.clear_layout(self.scroll_layout_todo) 
-
-        self.scroll_layout_todo.setSpacing(20) 
-
-        for index, todo in enumerate(self.todos_list):
-            row = QWidget()
-            row.setFixedHeight(80)
-            row_layout = QHBoxLayout(row)
-            row_layout.setContentsMargins(4, 4, 4, 4)
-            row_layout.setSpacing(6)
-
-            name = QLabel()
-            name.setObjectName("name_todo")
-            name.setMouseTracking(True)
-            text = f"{index+1}. {todo['title']}"
-
-            status = QPushButton("✅" if todo["status"] else "❌")
-            status.setObjectName("status_todo")
-
-            edit = QPushButton("📝")
-            edit.setObjectName("edit_todo")
-
-            name.setFixedHeight(70)
-            name.setFixedWidth(310)
-            name.adjustSize()
+    def on_todo_clicked(self, row, cell):
+        if cell == "status":
+            self.toggle_status_todo(row)
 
-            status.setFixedHeight(70)
-            edit.setFixedHeight(70)
-
-            status.clicked.connect(partial(self.toggle_status_todo, index, status))
-            edit.clicked.connect(partial(self.open_edit_todo, index))
-
-            if todo["status"]:
-                color = "lime"
-                border = "lime"
-            else:
-                color = "white" 
-                border= "red"   
-
-            row.setStyleSheet("""
-                                  QWidget{
-                                  background-color : rgba(0, 0, 0, 0.5);
-                                  }""")    
-
-            name.setStyleSheet(f"""
-                QLabel#name_todo {{
-                    font-size: 33px;
-                    border: 2px solid white;
-                    border-radius: 10px;
-                    color: {color};
-                    font-family: Segoe UI;
-                    font-weight: bold;
-                    background-color: rgba(0, 0, 0, 0.5);
-                    padding-left: 6px;
-                }}
-
-                QLabel#name_todo:hover {{
-                    background-color:rgba(255, 255, 255, 0.2);
-                }}
-            """) 
-
-            name.setAlignment(Qt.AlignVCenter | Qt.AlignLeft)
-            name.setSizePolicy(QSizePolicy.Fixed, QSizePolicy.Preferred)
-
-            name.   setAlignment(Qt.AlignVCenter | Qt.AlignLeft)
-            fm = name.fontMetrics()
-            elided = fm.elidedText(text, Qt.ElideRight, name.width())
-            
-            name.setText(elided)
-            name.setToolTip(text)
-            name.setCursor(Qt.PointingHandCursor) 
-
-            name.enterEvent = lambda e, t=name: QToolTip.showText(
-                t.mapToGlobal(t.rect().bottomLeft()),
-                t.toolTip(),
-                t
-            )
-            name.leaveEvent = lambda e: QToolTip.hideText() 
-
-            status.setStyleSheet(f"""QPushButton#status_todo{{
-                                font-size: 28px; border : 4px solid {border};
-                                border-radius : 10px;
-                                background-color : rgba(0, 0, 0, 0.5);
-                                }}
-                                
-                                QPushButton#status_todo:hover{{
-                                    background-color:rgba(255, 255, 255, 0.2);
-                                }}
-                                
-                                """)
-
-
-            edit.setStyleSheet("""QPushButton#edit_todo{font-size: 28px; border-radius : 10px;
-                                background-color : rgba(31, 41, 51, 0.8);
-                                border : 4px solid white;
-                               }
-                                QPushButton#edit_todo:hover{
-                                    background-color:rgba(255, 255, 255, 0.2);
-                               }
-                               """)
-
-
-
-            row_layout.addWidget(name)
-            row_layout.addWidget(status)
-            row_layout.addWidget(edit)
-
-            self.scroll_layout_todo.addWidget(row)
-
-        self.scroll_layout_todo.addStretch()    
+        elif cell == "edit":
+            self.open_edit_todo(row)
 
     def build_edit_todos(self):
-        
-        if hasattr(self, "edit_todo_page") :
-            self.stack.setCurrentWidget(self.edit_todo_page)
-            return
-
         self.edit_todo_page = QWidget()
         self.edit_todo_layout = QVBoxLayout(self.edit_todo_page)
 
@@ -360,34 +190,27 @@ class TodosMixin:
     def open_edit_todo(self, index):
         if index < 0 or index >= len(self.todos_list):
             return
+
+        self.ensure_page("edit_todo_page", self.build_edit_todos)
         
-        self.current_todo_index = index
+        # kept by id: a remote change merged while the page is open can re-sort the rows
+        self.current_todo_id = self.todos_list[index]["id"]
 
         todo = self.todos_list[index]
         self.new_todo.setText(todo["title"])      
 
-        if self.edit_todo_page not in [self.stack.widget(i) for i in  range(self.stack.count())]:
-            self.stack.addWidget(self.edit_todo_page)
-
         self.stack.setCurrentWidget(self.edit_todo_page)
 
         if hasattr(self, "header"):
             self.header.setText("Edit Todo")    
 
-    def toggle_status_todo(self, i, button):
+    def toggle_status_todo(self, i):
         if i < 0 or i >= len(self.todos_list):
             return
         
-        self.todos_list[i]["status"] = not self.todos_list[i]["status"]
-
-        if self.todos_list[i]["status"]:
-            button.setText("✅")
-        else:
-            button.setText("❌")  
+        todo = self.todos_list.update(i, status=not self.todos_list[i]["status"])
 
-        self.save_todo_file()
-        self.refresh_todos()
-        self.stack.setCurrentWidget(self.todo_page)      
+        self.save_todo_file(changed=[todo])
 
     def save_edited_todo(self):
         
@@ -398,28 +221,31 @@ class TodosMixin:
             QTimer.singleShot(2000, lambda: hasattr(self, "save_button_todo") and self.save_button_todo.setText("Save📁"))
             return
         
-        self.todos_list[self.current_todo_index]["title"] = new_todo
+        i = self.todos_list.index_of(self.current_todo_id)
+        if i < 0:
+            # removed on another device while it was being edited
+            self.open_todo_list_page()
+            return
+
+        todo = self.todos_list.update(i, title=new_todo)
 
-        self.save_todo_file()
-        self.refresh_todos()
+        self.save_todo_file(changed=[todo])
         self.open_todo_list_page()
 
     def delete_todo(self):
-        if not hasattr(self, "current_todo_index"):
+        if not hasattr(self, "current_todo_id"):
             return
         
-        i = self.current_todo_index
-        
-        del self.todos_list[i]
-        self.save_todo_file()
-        self.refresh_todos()
+        i = self.todos_list.index_of(self.current_todo_id)
+        if i < 0:
+            self.open_todo_list_page()
+            return
+
+        todo = self.todos_list.remove(i)
+        self.save_todo_file(deleted=[todo["id"]])
         self.open_todo_list_page()
 
     def build_add_todos_page(self):
-        if hasattr(self, "add_todo_page"):
-            self.stack.setCurrentWidget(self.add_todo_page)
-            return
-
         self.add_todo_page = QWidget()
         self.add_todo_layout = QVBoxLayout(self.add_todo_page)
 
@@ -460,8 +286,7 @@ class TodosMixin:
         self.add_todo_layout.addWidget(container, alignment= Qt.AlignCenter)
 
     def open_add_todo(self):
-        if self.add_todo_page not in [self.stack.widget(i) for i in range(self.stack.count())]:
-            self.stack.addWidget(self.add_todo_page)
+        self.ensure_page("add_todo_page", self.build_add_todos_page)
 
         self.stack.setCurrentWidget(self.add_todo_page)
 
@@ -483,9 +308,9 @@ class TodosMixin:
             "status" : False
         }
 
-        self.todos_list.append(todo)
+        todo = self.todos_list.add(todo)
 
-        self.save_todo_file()
+        self.save_todo_file(changed=[todo])
         self.todo.clear()
 
         self.confirm_todo.setText("Saved✅")
@@ -9,6 +9,8 @@ from PyQt5.QtWidgets import (
 )
 from PyQt5.QtCore import  QTime, Qt
 
+from themes import LIST_STYLE, cloud_status_style
+
 class UiMixin:
     def update_time(self):
         if hasattr(self, "time_label"):
@@ -19,6 +21,10 @@ class UiMixin:
             today = datetime.date.today().strftime("%d-%m-%Y")
             self.date_label.setText(str(today))
 
+        # keeps "last sync" in the metrics tooltip current while it is being read
+        if hasattr(self, "cloud_note") and self.cloud_status.underMouse():
+            self.set_cloud_tooltip(self.cloud_note)
+
     def menu_page(self):
         self.menu = QWidget()
 
@@ -51,6 +57,7 @@ class UiMixin:
 
         container_layout.addWidget(self.time_label)
         container_layout.addWidget(self.date_label)
+        container_layout.addWidget(self.build_account_box())
         container_layout.addWidget(self.addtask)
         container_layout.addWidget(self.viewtask)
         container_layout.addWidget(self.completetask)
@@ -154,6 +161,17 @@ class UiMixin:
         padding : 20px;
         }
 
+        QComboBox#account_box{
+        font-size : 30px;
+        font-family : Segoe UI;
+        border : 2px solid lime;
+        border-radius : 10px;
+        margin : 10px 20px;
+        padding : 5px;
+        background-color : rgba(0, 0, 0, 0.8);
+        color : lime;
+        }
+
         QLabel#time_label,#date_label{
         font-size : 30px;
         border : 2px solid lime;
@@ -198,17 +216,34 @@ class UiMixin:
         color : yellow;
        }
 
-        """
+        """ + LIST_STYLE + cloud_status_style()
+
+    def ensure_page(self, name, build):
+        if not hasattr(self, name):
+            build()
+
+        page = getattr(self, name)
+
+        if self.stack.indexOf(page) < 0:
+            self.stack.addWidget(page)
+
+        return page
+
+    def finish_startup(self):
+        # paint the menu before reading the stores, so the window never shows up blank
+        self.repaint()
+        self.startup.mark("first paint")
+
+        self.load_tasks()
+        self.startup.mark("tasks")
 
-    def clear_layout(self, layout):
-        while layout.count():
-            item = layout.takeAt(0)
+        self.load_todos()
+        self.startup.mark("todos")
 
-            if item.widget():
-                item.widget().deleteLater()
+        self.init_firebase()
+        self.startup.mark("firebase")
 
-            elif item.layout():
-                self.clear_layout(item.layout())    
+        print(self.startup.report())
 
     def back_to_menu(self,*_):
         self.stack.setCurrentWidget(self.menu)